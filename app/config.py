@@ -5,9 +5,11 @@ import os
 import logging
 import sys
 
-# Configure logging
+# Configure logging (LOG_LEVEL=INFO in production skips all debug formatting)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=getattr(logging, LOG_LEVEL, logging.DEBUG),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.StreamHandler(sys.stdout)
@@ -22,6 +24,29 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 AGENT_SECRET = os.getenv("AGENT_SECRET")
 
+# Optional direct Postgres access through Supabase's transaction pooler (port 6543)
+SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL")
+PG_POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", "5"))
+PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", "15"))  # Supabase pooler client cap
+
+# Max DB operations in flight per process; keep at or below the pooler's client limit
+DB_CONCURRENCY = int(os.getenv("DB_CONCURRENCY", "10"))
+
+# Max eligibility Gemini calls in flight per process (stay under the project's QPM quota)
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "16"))
+
+# Scraper limits: whole-page fetches in flight, and threads for blocking scraper clients
+SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", "8"))
+SCRAPER_THREADS = int(os.getenv("SCRAPER_THREADS", "16"))
+# Concurrent Playwright contexts (each is a renderer process's worth of memory)
+PW_MAX_CONTEXTS = int(os.getenv("PW_MAX_CONTEXTS", "4"))
+
+# Synthesize the onboarding fallback questions into the TTS cache at startup
+TTS_PREWARM = os.getenv("TTS_PREWARM", "true").lower() in ("1", "true", "yes")
+
+# Seconds to keep the active-program catalogue in memory (0 disables)
+PROGRAMS_CACHE_TTL = int(os.getenv("PROGRAMS_CACHE_TTL", "60"))
+
 # CORS allowed origins
 ALLOWED_ORIGINS = [
     "https://scholarmap.vercel.app",
@@ -36,3 +61,4 @@ logger.debug(f"SUPABASE_URL set: {bool(SUPABASE_URL)}")
 logger.debug(f"SUPABASE_SERVICE_KEY set: {bool(SUPABASE_SERVICE_KEY)}")
 logger.debug(f"GEMINI_API_KEY set: {bool(GEMINI_API_KEY)}")
 logger.debug(f"AGENT_SECRET set: {bool(AGENT_SECRET)}")
+logger.debug(f"SUPABASE_DB_URL set: {bool(SUPABASE_DB_URL)}")
@@ -1,16 +1,27 @@
 """
 Shared dependencies: Supabase client, Gemini client, authentication.
 """
+import asyncio
+import hmac
 import logging
+import time
+from contextlib import asynccontextmanager
+import asyncpg
+import httpx
+import orjson
 from fastapi import Header, HTTPException
-from supabase import create_client, Client
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
 from google import genai
 
 from .config import (
     SUPABASE_URL,
     SUPABASE_SERVICE_KEY,
     GEMINI_API_KEY,
-    AGENT_SECRET
+    AGENT_SECRET,
+    SUPABASE_DB_URL,
+    PG_POOL_MIN_SIZE,
+    PG_POOL_MAX_SIZE,
+    DB_CONCURRENCY,
 )
 
 logger = logging.getLogger(__name__)
@@ -25,32 +36,122 @@ except Exception as e:
     gemini_client = None
 
 
-def get_supabase() -> Client:
-    """Create and return a Supabase client instance."""
-    logger.debug("Creating Supabase client...")
-    client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-    logger.debug("Supabase client created")
-    return client
+_async_supabase: AsyncClient | None = None
+_async_supabase_http: httpx.AsyncClient | None = None
+_async_supabase_lock = asyncio.Lock()
+
+
+async def get_supabase_async() -> AsyncClient:
+    """Return the shared async Supabase client (created at startup, or on first use)."""
+    global _async_supabase, _async_supabase_http
+    if _async_supabase is None:
+        async with _async_supabase_lock:
+            if _async_supabase is None:
+                logger.debug("Creating async Supabase client...")
+                # One keep-alive pool for every PostgREST call instead of per-request handshakes
+                _async_supabase_http = httpx.AsyncClient(
+                    http2=True,
+                    follow_redirects=True,
+                    timeout=httpx.Timeout(60.0, connect=5.0),
+                    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+                )
+                _async_supabase = await acreate_client(
+                    SUPABASE_URL,
+                    SUPABASE_SERVICE_KEY,
+                    options=AsyncClientOptions(httpx_client=_async_supabase_http),
+                )
+                logger.debug("Async Supabase client created")
+    return _async_supabase
+
+
+async def close_supabase_async():
+    """Close the shared Supabase HTTP connections. Called on application shutdown."""
+    global _async_supabase, _async_supabase_http
+    if _async_supabase_http is not None:
+        await _async_supabase_http.aclose()
+    _async_supabase = None
+    _async_supabase_http = None
+
+
+_pg_pool: asyncpg.Pool | None = None
+_pg_pool_lock = asyncio.Lock()
+
+
+async def _init_pg_connection(conn: asyncpg.Connection):
+    """Decode/encode json and jsonb columns with orjson."""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=lambda value: orjson.dumps(value).decode(),
+            decoder=orjson.loads,
+            schema="pg_catalog",
+        )
+
+
+async def get_pg_pool() -> asyncpg.Pool | None:
+    """
+    Return the shared asyncpg pool, or None when SUPABASE_DB_URL is not configured.
+
+    Intended for Supabase's transaction pooler (PgBouncer/Supavisor), so the
+    prepared-statement cache is disabled.
+    """
+    global _pg_pool
+    if not SUPABASE_DB_URL:
+        return None
+    if _pg_pool is None:
+        async with _pg_pool_lock:
+            if _pg_pool is None:
+                logger.debug("Creating Postgres connection pool...")
+                _pg_pool = await asyncpg.create_pool(
+                    dsn=SUPABASE_DB_URL,
+                    min_size=PG_POOL_MIN_SIZE,
+                    max_size=PG_POOL_MAX_SIZE,
+                    statement_cache_size=0,
+                    max_inactive_connection_lifetime=300,
+                    init=_init_pg_connection,
+                )
+                logger.debug("Postgres connection pool created")
+    return _pg_pool
+
+
+async def close_pg_pool():
+    """Close the asyncpg pool. Called on application shutdown."""
+    global _pg_pool
+    if _pg_pool is not None:
+        await _pg_pool.close()
+        _pg_pool = None
+
+
+# Caps concurrent DB work per process so bursts queue here instead of
+# exhausting the pooler ("Max client connections reached")
+DB_SEM = asyncio.Semaphore(DB_CONCURRENCY)
+DB_SLOW_WAIT_SECONDS = 0.5
+
+
+@asynccontextmanager
+async def db_slot():
+    """Hold a DB_SEM slot for the duration of a DB operation."""
+    start = time.monotonic()
+    async with DB_SEM:
+        waited = time.monotonic() - start
+        if waited > DB_SLOW_WAIT_SECONDS:
+            # Frequent warnings mean DB_CONCURRENCY (or the pooler size) is too small
+            logger.warning("Waited %.2fs for a DB slot (DB_CONCURRENCY=%s)", waited, DB_CONCURRENCY)
+        yield
+
+
+# Built once; compared in constant time on every request
+_EXPECTED_AUTH = f"Bearer {AGENT_SECRET}".encode()
 
 
 def verify_token(authorization: str = Header(None)):
-    """Verify the bearer token in the Authorization header."""
-    logger.debug("=== TOKEN VERIFICATION ===")
-    logger.debug(f"Authorization header received: {authorization is not None}")
-    
-    if authorization:
-        logger.debug(f"Authorization header value (first 20 chars): {authorization[:20]}...")
-    if AGENT_SECRET:
-        logger.debug(f"Expected token starts with: Bearer {AGENT_SECRET[:10]}...")
-    
+    """Verify the bearer token in the Authorization header (use as a route dependency)."""
     if not authorization:
         logger.error("No authorization header provided")
         raise HTTPException(status_code=401, detail="Authorization header missing")
-    
-    expected = f"Bearer {AGENT_SECRET}"
-    if authorization != expected:
+
+    if not hmac.compare_digest(authorization.encode(), _EXPECTED_AUTH):
         logger.error("Token mismatch!")
-        logger.debug(f"Received length: {len(authorization)}, Expected length: {len(expected)}")
         raise HTTPException(status_code=401, detail="Unauthorized - token mismatch")
-    
+
     logger.debug("Token verified successfully")
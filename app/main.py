@@ -14,13 +14,16 @@ Structure:
 - /tts              - Text-to-speech (one-off conversion)
 - /live/ada         - WebSocket speech-to-speech (real-time)
 """
+import asyncio
 import logging
+import sys
 import traceback
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 
-from .config import ALLOWED_ORIGINS, logger
+from .config import ALLOWED_ORIGINS, TTS_PREWARM, logger
 from .routers import (
     ingestion_router,
     eligibility_router,
@@ -28,12 +31,49 @@ from .routers import (
     tts_router,
     live_router,
 )
+from .dependencies import get_supabase_async, close_supabase_async, get_pg_pool, close_pg_pool
+from .services.scraper import close_scraper_sessions
+from .routers.tts import prewarm_tts_cache
+from .routers.onboarding import FALLBACK_QUESTIONS, FALLBACK_DONE
+
+# Use libuv-backed event loop where available (not supported on Windows)
+if sys.platform != "win32":
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan: create shared clients up front, release them on shutdown."""
+    logger.info("=== APPLICATION STARTUP ===")
+    await get_supabase_async()
+    try:
+        await get_pg_pool()
+    except Exception as e:
+        # Not fatal: get_pg_pool() retries on the next request that needs it
+        logger.error("Postgres pool unavailable at startup: %s", e)
+    # Runs in the background so startup isn't held up by TTS calls
+    prewarm_task = None
+    if TTS_PREWARM:
+        prewarm_task = asyncio.create_task(
+            prewarm_tts_cache([*FALLBACK_QUESTIONS.values(), FALLBACK_DONE])
+        )
+    yield
+    logger.info("=== APPLICATION SHUTDOWN ===")
+    if prewarm_task:
+        prewarm_task.cancel()
+    await close_scraper_sessions()
+    await close_pg_pool()
+    await close_supabase_async()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="ScholarMap Agent",
     version="2.0.0",
-    description="AI-powered scholarship discovery microservice"
+    description="AI-powered scholarship discovery microservice",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 
@@ -59,6 +99,10 @@ async def global_exception_handler(request: Request, exc: Exception):
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     """Log all incoming requests (debug level)."""
+    # Outside DEBUG this is a pass-through: no URL formatting, no buffering of POST bodies
+    if not logger.isEnabledFor(logging.DEBUG):
+        return await call_next(request)
+
     logger.debug("=== INCOMING REQUEST ===")
     logger.debug(f"Method: {request.method}")
     logger.debug(f"URL: {request.url}")
@@ -1,7 +1,14 @@
 """
 Pydantic models for request/response schemas.
 """
-from pydantic import BaseModel, HttpUrl
+import uuid
+from typing import Annotated, Any, Literal
+
+from pydantic import BaseModel, Field
+
+# Ingest URLs come from trusted admin tooling; a scheme check is enough here and
+# the scraper's own guard (ensure_public_url) vets the host before fetching
+HTTP_URL_PATTERN = r"^https?://\S+$"
 
 
 # ============================================================================
@@ -10,8 +17,8 @@ from pydantic import BaseModel, HttpUrl
 
 class IngestRequest(BaseModel):
     """Request model for single URL ingestion."""
-    url: HttpUrl
-    program_id: str | None = None
+    url: Annotated[str, Field(pattern=HTTP_URL_PATTERN)]
+    program_id: uuid.UUID | None = None
 
 
 class IngestResponse(BaseModel):
@@ -25,6 +32,7 @@ class IngestResponse(BaseModel):
 class BatchIngestRequest(BaseModel):
     """Request model for batch URL ingestion."""
     urls: list[str]
+    force: bool = False  # Re-ingest URLs even if they were ingested recently
 
 
 class BatchItemResult(BaseModel):
@@ -36,6 +44,7 @@ class BatchItemResult(BaseModel):
     issues: list[str] = []
     error: str | None = None
     processing_time: float = 0.0
+    cached: bool = False  # Skipped: URL already has a fresh source row
 
 
 class BatchIngestResponse(BaseModel):
@@ -141,3 +150,90 @@ class TTSResponse(BaseModel):
     audio_base64: str
     format: str = "pcm"
     sample_rate: int = 24000
+
+
+# ============================================================================
+# LLM OUTPUT SCHEMAS
+# ============================================================================
+# Passed to Gemini as response_json_schema so responses are pure, well-formed JSON.
+# Values are still run through the sanitize_* functions before they reach the DB.
+
+class ExtractedRule(BaseModel):
+    """One eligibility rule as extracted from a program page."""
+    rule_type: Literal['gpa', 'degree', 'nationality', 'age', 'work_experience', 'language', 'other']
+    operator: Literal['=', '>=', '<=', '>', '<', 'in', 'not_in', 'exists', 'between']
+    value: dict[str, Any]
+    confidence: Literal['high', 'medium', 'inferred']
+    source_snippet: str | None = None
+
+
+class ExtractedRequirement(BaseModel):
+    """One application requirement as extracted from a program page."""
+    type: Literal['transcript', 'cv', 'essay', 'references', 'proposal', 'test', 'interview', 'other']
+    description: str
+    mandatory: bool = True
+
+
+class ExtractedDeadline(BaseModel):
+    """One deadline as extracted from a program page."""
+    cycle: str | None = None
+    deadline_date: str | None = None  # YYYY-MM-DD
+    stage: Literal['application', 'interview', 'nomination', 'result']
+
+
+class ExtractedBenefits(BaseModel):
+    """Benefits block of an extracted program."""
+    tuition: bool | None = None
+    stipend: str | None = None
+    housing: bool | None = None
+    travel: str | None = None
+    insurance: bool | None = None
+    other: str | None = None
+
+
+class ExtractedProgram(BaseModel):
+    """Full extraction result for one program page (see EXTRACTION_PROMPT)."""
+    name: str
+    provider: str | None = None
+    host_institution: str | None = None
+    level: Literal['bachelor', 'masters', 'phd', 'postdoc'] | None = None
+    funding_type: Literal['full', 'partial', 'tuition_only', 'stipend_only'] | None = None
+    countries_eligible: list[str] = []
+    countries_of_study: list[str] = []
+    fields: list[str] = []
+    description: str | None = None
+    who_wins: str | None = None
+    rejection_reasons: str | None = None
+    application_url: str | None = None
+    benefits: ExtractedBenefits | None = None
+    award_amount: str | None = None
+    number_of_awards: int | None = None
+    is_renewable: bool | None = None
+    duration: str | None = None
+    age_min: int | None = None
+    age_max: int | None = None
+    gpa_min: float | None = None
+    language_requirements: list[str] = []
+    contact_email: str | None = None
+    eligibility_rules: list[ExtractedRule] = []
+    requirements: list[ExtractedRequirement] = []
+    deadlines: list[ExtractedDeadline] = []
+    confidence_score: float
+    issues: list[str] = []
+
+
+class ExtractedPage(ExtractedProgram):
+    """ExtractedProgram tagged with its position in a multi-page extraction."""
+    page: int
+    url: str
+
+
+class EligibilityAnalysis(BaseModel):
+    """LLM verdict for one scholarship in a grouped eligibility call."""
+    index: int
+    match_score: int
+    status: Literal['eligible', 'likely_eligible', 'maybe', 'unlikely', 'not_eligible']
+    explanation: str
+    strengths: list[str] = []
+    concerns: list[str] = []
+    action_items: list[str] = []
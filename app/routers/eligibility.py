@@ -1,22 +1,58 @@
 """
 Eligibility router - /check-eligibility endpoint.
 """
+import asyncio
 import logging
 import time
 from google.genai import types
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 
-from ..dependencies import get_supabase, gemini_client
+from ..dependencies import gemini_client
 from ..models.schemas import (
     EligibilityCheckRequest,
     EligibilityCheckResponse,
 )
 from ..services.eligibility import analyze_eligibility_batch
+from ..services.programs import fetch_active_programs
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+MATCH_STATUSES = ('eligible', 'likely_eligible', 'maybe', 'unlikely', 'not_eligible')
+
+# The summary is a nice-to-have; never let it hold up the response for longer than this
+SUMMARY_TIMEOUT_SECONDS = 3.0
+
+
+async def _generate_summary(profile, total_programs: int, total_good: int) -> str | None:
+    """Ask Gemini for a short personalized summary; None on error or timeout."""
+    summary_prompt = f"""Based on the analysis of {total_programs} scholarships for a student from {profile.nationality} 
+with a {profile.degree} degree, {total_good} scholarships look promising.
+
+Write a 2-3 sentence encouraging and personalized summary for them. Be specific about their opportunities.
+Return ONLY the summary text, no JSON."""
+
+    try:
+        summary_response = await asyncio.wait_for(
+            gemini_client.aio.models.generate_content(
+                model="gemini-2.5-flash",
+                contents=summary_prompt,
+                config=types.GenerateContentConfig(
+                    max_output_tokens=200,
+                    # No thinking: a 2-3 sentence summary doesn't need it, and it wouldn't fit the timeout
+                    thinking_config=types.ThinkingConfig(thinking_budget=0),
+                )
+            ),
+            timeout=SUMMARY_TIMEOUT_SECONDS,
+        )
+        return (summary_response.text or "").strip() or None
+    except asyncio.TimeoutError:
+        logger.warning("AI summary timed out after %.1fs - using fallback", SUMMARY_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning("AI summary failed: %s: %s", type(e).__name__, e)
+    return None
+
 
 @router.post("/check-eligibility", response_model=EligibilityCheckResponse)
 async def check_eligibility(request: EligibilityCheckRequest):
@@ -24,22 +60,14 @@ async def check_eligibility(request: EligibilityCheckRequest):
     start_time = time.time()
 
     logger.info("=== ELIGIBILITY CHECK START ===")
-    logger.info(f"Profile: {request.profile.nationality}, {request.profile.degree}")
+    logger.info("Profile: %s, %s", request.profile.nationality, request.profile.degree)
 
-    supabase = get_supabase()
-
-    # Fetch all active programs with eligibility rules
-    result = supabase.table("programs").select(
-        "id, name, provider, level, funding_type, description, "
-        "countries_eligible, countries_of_study, fields, who_wins, "
-        "age_min, age_max, gpa_min, eligibility_rules(*)"
-    ).eq("status", "active").execute()
-
-    programs = result.data or []
-    logger.info(f"Found {len(programs)} active programs to analyze")
+    # Fetch active programs at the requested degree level, with eligibility rules
+    programs = await fetch_active_programs(request.profile.target_degree)
+    logger.info("Found %d active programs to analyze", len(programs))
 
     if not programs:
-        return EligibilityCheckResponse(
+        return EligibilityCheckResponse.model_construct(
             eligible=[],
             likely_eligible=[],
             maybe=[],
@@ -53,44 +81,39 @@ async def check_eligibility(request: EligibilityCheckRequest):
     # Analyze all programs
     matches = await analyze_eligibility_batch(request.profile, programs)
 
+    # Start the summary now so it overlaps with sorting and bucketing
+    total_good = sum(1 for m in matches if m.status in ('eligible', 'likely_eligible'))
+    summary_task = asyncio.create_task(_generate_summary(request.profile, len(programs), total_good))
+
     # Sort by match score
     matches.sort(key=lambda x: x.match_score, reverse=True)
 
-    # Categorize results
-    eligible = [m for m in matches if m.status == 'eligible']
-    likely_eligible = [m for m in matches if m.status == 'likely_eligible']
-    maybe = [m for m in matches if m.status == 'maybe']
-    unlikely = [m for m in matches if m.status == 'unlikely']
-    not_eligible = [m for m in matches if m.status == 'not_eligible']
+    # Categorize results in one pass (sorted order is kept within each bucket)
+    buckets = {status: [] for status in MATCH_STATUSES}
+    for m in matches:
+        bucket = buckets.get(m.status)
+        if bucket is not None:
+            bucket.append(m)
+    eligible = buckets['eligible']
+    likely_eligible = buckets['likely_eligible']
+    maybe = buckets['maybe']
+    unlikely = buckets['unlikely']
+    not_eligible = buckets['not_eligible']
 
     processing_time = time.time() - start_time
 
-    # Generate overall summary
-    total_good = len(eligible) + len(likely_eligible)
-    summary_prompt = f"""Based on the analysis of {len(programs)} scholarships for a student from {request.profile.nationality} 
-with a {request.profile.degree} degree, {total_good} scholarships look promising.
-
-Write a 2-3 sentence encouraging and personalized summary for them. Be specific about their opportunities.
-Return ONLY the summary text, no JSON."""
-
-    try:
-        summary_response = gemini_client.models.generate_content(
-            model="gemini-2.5-pro",
-            contents=summary_prompt,
-            config=types.GenerateContentConfig(max_output_tokens=200)
-        )
-        ai_summary = summary_response.text.strip()
-    except:
+    ai_summary = await summary_task
+    if not ai_summary:
         if total_good > 0:
             ai_summary = f"Great news! We found {total_good} scholarship{'s' if total_good != 1 else ''} that match your profile well. Your background and qualifications open up some exciting opportunities."
         else:
             ai_summary = f"While we didn't find perfect matches, there are {len(maybe)} scholarships worth exploring. Don't give up - many successful scholars didn't fit traditional profiles."
 
     logger.info("=== ELIGIBILITY CHECK COMPLETE ===")
-    logger.info(f"Results: {len(eligible)} eligible, {len(likely_eligible)} likely, {len(maybe)} maybe, {len(not_eligible)} not eligible")
-    logger.info(f"Processing time: {processing_time:.2f}s")
+    logger.info("Results: %d eligible, %d likely, %d maybe, %d not eligible", len(eligible), len(likely_eligible), len(maybe), len(not_eligible))
+    logger.info("Processing time: %.2fs", processing_time)
 
-    return EligibilityCheckResponse(
+    response = EligibilityCheckResponse.model_construct(
         eligible=eligible,
         likely_eligible=likely_eligible,
         maybe=maybe,
@@ -100,3 +123,5 @@ Return ONLY the summary text, no JSON."""
         processing_time=processing_time,
         ai_summary=ai_summary
     )
+    # Serialize directly with pydantic-core; skips FastAPI's re-validation of every ProgramMatch
+    return Response(content=response.model_dump_json(), media_type="application/json")
@@ -2,87 +2,185 @@
 Ingestion router - /ingest, /batch-ingest, /recheck, /health endpoints.
 """
 import logging
-import json
 import asyncio
+import orjson
+import re
 import time
-import traceback
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Header, Request
-from pydantic import ValidationError
+import uuid
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Response
 
-from ..dependencies import get_supabase, verify_token
+from ..dependencies import get_supabase_async, get_pg_pool, db_slot, verify_token
 from ..models.schemas import (
     IngestRequest,
     IngestResponse,
     BatchIngestRequest,
     BatchItemResult,
     BatchIngestResponse,
+    HTTP_URL_PATTERN,
 )
 from ..services.scraper import fetch_page_content
+from ..services.programs import invalidate_programs_cache
 from ..services.extraction import (
     extract_with_gemini,
+    extract_with_gemini_batch,
+    chunk_pages,
     sanitize_program_data,
     sanitize_eligibility_rule,
     sanitize_requirement,
     sanitize_deadline,
+    utc_now_iso,
 )
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Batch URLs are plain strings; vet them with the same pattern IngestRequest uses
+_HTTP_URL_RE = re.compile(HTTP_URL_PATTERN)
 
-@router.get("/health")
-async def health():
-    """Health check endpoint."""
-    logger.debug("Health check requested")
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+# Concurrent scrape workers per batch
+BATCH_WORKERS = 5
 
+# Batch URLs with a source row younger than this are skipped unless force=True
+SOURCE_FRESH_DAYS = 7
 
-@router.post("/ingest", response_model=IngestResponse)
-async def ingest(request: Request, authorization: str = Header(None)):
-    """Ingest a single scholarship URL."""
-    logger.debug("=== INGEST ENDPOINT CALLED ===")
+# Batch extraction limits: Gemini calls started per second, and per-page ceiling
+BATCH_EXTRACT_RATE = 10
+BATCH_EXTRACT_TIMEOUT = 60.0
 
-    verify_token(authorization)
+_extract_lock = asyncio.Lock()
+_extract_next_at = 0.0
 
-    # Parse body manually for better error messages
-    try:
-        body = await request.body()
-        logger.debug(f"Request body: {body.decode('utf-8')}")
-        body_json = json.loads(body)
-        logger.debug(f"Parsed JSON: {body_json}")
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {e}")
-        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
 
-    try:
-        ingest_request = IngestRequest(**body_json)
-        logger.debug(f"Pydantic validation passed. URL: {ingest_request.url}")
-    except ValidationError as e:
-        logger.error(f"Pydantic validation error: {e}")
-        raise HTTPException(status_code=400, detail=f"Validation error: {e.errors()}")
+async def _throttle_extraction():
+    """Space out batch Gemini calls to BATCH_EXTRACT_RATE per second."""
+    global _extract_next_at
+    async with _extract_lock:
+        now = asyncio.get_running_loop().time()
+        wait = _extract_next_at - now
+        _extract_next_at = max(now, _extract_next_at) + 1 / BATCH_EXTRACT_RATE
+    if wait > 0:
+        await asyncio.sleep(wait)
 
-    supabase = get_supabase()
+
+@router.get("/health")
+async def health():
+    """Health check endpoint."""
+    logger.debug("Health check requested")
+    return {"status": "healthy", "timestamp": utc_now_iso()}
+
+
+def _raw_summary(extracted: dict) -> str:
+    """Compact audit record for sources.raw_summary (the full extraction lives in the cache)."""
+    return orjson.dumps({
+        "program_name": extracted.get("name"),
+        "confidence_score": extracted.get("confidence_score"),
+        "issues": extracted.get("issues", []),
+        "counts": {
+            "rules": len(extracted.get("eligibility_rules") or []),
+            "requirements": len(extracted.get("requirements") or []),
+            "deadlines": len(extracted.get("deadlines") or []),
+        },
+    }).decode()
+
+
+def _build_payload(extracted: dict, url: str, confidence: float, issues: list[str], verified_at: str | None = None) -> dict:
+    """Sanitize an extraction into create_program_with_children arguments (program_id is assigned in SQL)."""
+    # Sanitizers return insertable rows, or None for rows to drop
+    rules_rows = [r for r in map(sanitize_eligibility_rule, extracted.get("eligibility_rules") or []) if r]
+    req_rows = [r for r in map(sanitize_requirement, extracted.get("requirements") or []) if r]
+    deadline_rows = [r for r in map(sanitize_deadline, extracted.get("deadlines") or []) if r]
+
+    source_row = {
+        "url": url,
+        "agent_model": "gemini-2.5-pro",
+        "raw_summary": _raw_summary(extracted),
+        "confidence_score": confidence
+    }
+
+    review_rows = [
+        {
+            "issue_type": "suspicious" if confidence < 0.5 else "missing_data",
+            "note": issue,
+            "severity": "high" if confidence < 0.5 else "low"
+        }
+        for issue in issues
+    ]
+
+    return {
+        "p_program": sanitize_program_data(extracted, url, verified_at),
+        "p_rules": rules_rows,
+        "p_requirements": req_rows,
+        "p_deadlines": deadline_rows,
+        "p_source": source_row,
+        "p_reviews": review_rows,
+    }
+
+
+async def _persist(supabase, payload: dict, program_id: str | None = None) -> str:
+    """Write a program and its children in one transaction (see migrations/004)."""
+    pool = await get_pg_pool()
+    if pool:
+        async with db_slot():
+            new_id = await pool.fetchval(
+                "SELECT public.create_program_with_children($1, $2, $3, $4, $5, $6, $7)",
+                payload["p_program"], payload["p_rules"], payload["p_requirements"],
+                payload["p_deadlines"], payload["p_source"], payload["p_reviews"], program_id,
+            )
+        invalidate_programs_cache()
+        return str(new_id)
+
+    async with db_slot():
+        result = await supabase.rpc(
+            "create_program_with_children", {**payload, "p_program_id": program_id}
+        ).execute()
+    invalidate_programs_cache()
+    return result.data
+
+
+async def _persist_many(supabase, payloads: list[dict]) -> list[dict]:
+    """
+    Write many programs in one round trip (see migrations/006).
+
+    Returns one {"program_id": ...} or {"error": ...} per payload, in order;
+    each program is written atomically and a failure doesn't affect the others.
+    """
+    pool = await get_pg_pool()
+    if pool:
+        async with db_slot():
+            outcomes = await pool.fetchval(
+                "SELECT public.create_programs_with_children($1)", payloads
+            )
+    else:
+        async with db_slot():
+            result = await supabase.rpc(
+                "create_programs_with_children", {"p_items": payloads}
+            ).execute()
+        outcomes = result.data
+    invalidate_programs_cache()
+    return outcomes or []
+
+
+async def _ingest_url(url: str, program_id: str | None = None) -> IngestResponse:
+    """Scrape, extract and write one URL; replaces program_id's data when given."""
     issues = []
 
     # Fetch page
     try:
-        logger.debug(f"Fetching URL: {ingest_request.url}")
-        content = await fetch_page_content(str(ingest_request.url))
-        logger.debug(f"Page fetched, content length: {len(content)}")
+        logger.debug("Fetching URL: %s", url)
+        content = await fetch_page_content(url)
+        logger.debug("Page fetched, content length: %d", len(content))
     except Exception as e:
-        logger.error(f"Error fetching URL: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("Error fetching URL: %s", e)
         raise HTTPException(status_code=400, detail=f"Failed to fetch URL: {e}")
 
     # Extract with Gemini
     try:
         logger.debug("Starting Gemini extraction...")
-        extracted = extract_with_gemini(content)
-        logger.debug(f"Extraction complete. Keys: {list(extracted.keys())}")
+        extracted = await extract_with_gemini(content)
+        logger.debug("Extraction complete. Keys: %s", list(extracted))
     except Exception as e:
-        logger.error(f"Extraction failed: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("Extraction failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Extraction failed: {e}")
 
     confidence = extracted.get("confidence_score", 0.5)
@@ -91,106 +189,100 @@ async def ingest(request: Request, authorization: str = Header(None)):
     if confidence < 0.5:
         issues.append("Low confidence extraction - manual review recommended")
 
-    program_data = sanitize_program_data(extracted, str(ingest_request.url))
+    payload = _build_payload(extracted, url, confidence, issues)
 
+    # Program + children are written in one Postgres transaction (see migrations/004)
     try:
-        if ingest_request.program_id:
-            logger.debug(f"Updating existing program: {ingest_request.program_id}")
-            supabase.table("programs").update(program_data).eq("id", ingest_request.program_id).execute()
-            program_id = ingest_request.program_id
-            supabase.table("eligibility_rules").delete().eq("program_id", program_id).execute()
-            supabase.table("requirements").delete().eq("program_id", program_id).execute()
-            supabase.table("deadlines").delete().eq("program_id", program_id).execute()
+        if program_id:
+            logger.debug("Updating existing program: %s", program_id)
         else:
             logger.debug("Inserting new program...")
-            result = supabase.table("programs").insert(program_data).execute()
-            program_id = result.data[0]["id"]
-            logger.debug(f"New program created with ID: {program_id}")
-
-        # Insert eligibility rules
-        for rule in extracted.get("eligibility_rules", []):
-            sanitized = sanitize_eligibility_rule(rule)
-            if sanitized:
-                supabase.table("eligibility_rules").insert({
-                    "program_id": program_id,
-                    "rule_type": sanitized["rule_type"],
-                    "operator": sanitized["operator"],
-                    "value": sanitized["value"],
-                    "confidence": sanitized["confidence"],
-                    "source_snippet": sanitized["source_snippet"]
-                }).execute()
-
-        # Insert requirements
-        for req in extracted.get("requirements", []):
-            sanitized = sanitize_requirement(req)
-            if sanitized:
-                supabase.table("requirements").insert({
-                    "program_id": program_id,
-                    "type": sanitized["type"],
-                    "description": sanitized["description"],
-                    "mandatory": sanitized["mandatory"]
-                }).execute()
-
-        # Insert deadlines
-        for deadline in extracted.get("deadlines", []):
-            sanitized = sanitize_deadline(deadline)
-            if sanitized and sanitized.get("deadline_date"):
-                supabase.table("deadlines").insert({
-                    "program_id": program_id,
-                    "cycle": sanitized["cycle"],
-                    "deadline_date": sanitized["deadline_date"],
-                    "stage": sanitized["stage"]
-                }).execute()
-
-        # Insert source
-        supabase.table("sources").insert({
-            "program_id": program_id,
-            "url": str(ingest_request.url),
-            "agent_model": "gemini-2.5-pro",
-            "raw_summary": json.dumps(extracted)[:10000],
-            "confidence_score": confidence
-        }).execute()
-
-        # Insert reviews if issues
-        for issue in issues:
-            supabase.table("agent_reviews").insert({
-                "program_id": program_id,
-                "issue_type": "suspicious" if confidence < 0.5 else "missing_data",
-                "note": issue,
-                "severity": "high" if confidence < 0.5 else "low"
-            }).execute()
+        supabase = await get_supabase_async()
+        program_id = await _persist(supabase, payload, program_id)
+        logger.debug("Program written with ID: %s", program_id)
 
     except Exception as e:
-        logger.error(f"Database error: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("Database error: %s", e)
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
     logger.debug("=== INGEST COMPLETE ===")
-    return IngestResponse(success=True, program_id=program_id, confidence=confidence, issues=issues)
+    return IngestResponse.model_construct(success=True, program_id=program_id, confidence=confidence, issues=issues)
+
+
+@router.post("/ingest", response_model=IngestResponse, dependencies=[Depends(verify_token)])
+async def ingest(ingest_request: IngestRequest):
+    """Ingest a single scholarship URL."""
+    logger.debug("=== INGEST ENDPOINT CALLED ===")
+    logger.debug("URL: %s", ingest_request.url)
 
+    program_id = ingest_request.program_id
+    return await _ingest_url(ingest_request.url, str(program_id) if program_id else None)
 
-@router.post("/recheck")
-async def recheck(program_id: str, authorization: str = Header(None)):
-    """Recheck an existing program."""
-    logger.debug(f"Recheck requested for program: {program_id}")
-    verify_token(authorization)
 
-    supabase = get_supabase()
-    program = supabase.table("programs").select("official_url").eq("id", program_id).single().execute()
-    if not program.data:
+@router.post("/recheck", response_model=IngestResponse, dependencies=[Depends(verify_token)])
+async def recheck(program_id: uuid.UUID):
+    """Re-scrape an existing program's official URL and replace its extracted data."""
+    # FastAPI rejects malformed IDs with a 422 before the handler (and the DB) is reached
+    logger.debug("Recheck requested for program: %s", program_id)
+    program_id = str(program_id)
+
+    supabase = await get_supabase_async()
+    async with db_slot():
+        program = await supabase.table("programs").select("official_url").eq("id", program_id).maybe_single().execute()
+    if not program or not program.data:
         raise HTTPException(status_code=404, detail="Program not found")
 
-    return {"message": "Use /ingest endpoint directly with program_id parameter"}
+    url = program.data.get("official_url")
+    if not url:
+        raise HTTPException(status_code=400, detail="Program has no official_url to recheck")
+
+    return await _ingest_url(url, program_id)
+
+
+async def _fresh_sources(urls: list[str]) -> dict[str, str]:
+    """Map each URL with a source row newer than SOURCE_FRESH_DAYS to its program_id."""
+    try:
+        pool = await get_pg_pool()
+        if pool:
+            async with db_slot():
+                rows = await pool.fetch(
+                    "SELECT DISTINCT ON (url) url, program_id::text AS program_id "
+                    "FROM public.sources "
+                    "WHERE url = ANY($1::text[]) AND created_at > now() - make_interval(days => $2) "
+                    "ORDER BY url, created_at DESC",
+                    urls, SOURCE_FRESH_DAYS,
+                )
+            return {row["url"]: row["program_id"] for row in rows}
+
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=SOURCE_FRESH_DAYS)).isoformat()
+        supabase = await get_supabase_async()
+        async with db_slot():
+            result = await supabase.table("sources").select("url, program_id").in_(
+                "url", urls
+            ).gte("created_at", cutoff).order("created_at", desc=True).execute()
+        fresh = {}
+        for row in result.data or []:
+            fresh.setdefault(row["url"], row["program_id"])
+        return fresh
+    except Exception as e:
+        # Not fatal - the batch just re-ingests everything
+        logger.warning("[BATCH] Freshness check failed: %s", e)
+        return {}
+
 
+async def _scrape_batch_item(url: str) -> BatchItemResult | dict:
+    """
+    Scrape one batch URL.
 
-async def process_single_url(url: str, supabase) -> BatchItemResult:
-    """Process a single URL for batch ingestion."""
+    Returns a failed BatchItemResult, or {"url", "content", "start_time"} for
+    the grouped extraction step.
+    """
     start_time = time.time()
 
     try:
-        logger.debug(f"[BATCH] Processing: {url}")
+        logger.debug("[BATCH] Processing: %s", url)
 
-        if not url.startswith(('http://', 'https://')):
+        if not _HTTP_URL_RE.match(url):
             return BatchItemResult(
                 url=url,
                 success=False,
@@ -198,8 +290,6 @@ async def process_single_url(url: str, supabase) -> BatchItemResult:
                 processing_time=time.time() - start_time
             )
 
-        issues = []
-
         # Fetch content
         try:
             content = await fetch_page_content(url)
@@ -218,98 +308,10 @@ async def process_single_url(url: str, supabase) -> BatchItemResult:
                 processing_time=time.time() - start_time
             )
 
-        # Extract with Gemini
-        try:
-            extracted = extract_with_gemini(content)
-        except Exception as e:
-            return BatchItemResult(
-                url=url,
-                success=False,
-                error=f"AI extraction failed: {str(e)}",
-                processing_time=time.time() - start_time
-            )
-
-        confidence = extracted.get("confidence_score", 0.5)
-        issues.extend(extracted.get("issues", []))
-
-        if confidence < 0.5:
-            issues.append("Low confidence extraction - manual review recommended")
-
-        program_data = sanitize_program_data(extracted, url)
-
-        # Insert into database
-        try:
-            result = supabase.table("programs").insert(program_data).execute()
-            program_id = result.data[0]["id"]
-
-            for rule in extracted.get("eligibility_rules", []):
-                sanitized = sanitize_eligibility_rule(rule)
-                if sanitized:
-                    supabase.table("eligibility_rules").insert({
-                        "program_id": program_id,
-                        "rule_type": sanitized["rule_type"],
-                        "operator": sanitized["operator"],
-                        "value": sanitized["value"],
-                        "confidence": sanitized["confidence"],
-                        "source_snippet": sanitized["source_snippet"]
-                    }).execute()
-
-            for req in extracted.get("requirements", []):
-                sanitized = sanitize_requirement(req)
-                if sanitized:
-                    supabase.table("requirements").insert({
-                        "program_id": program_id,
-                        "type": sanitized["type"],
-                        "description": sanitized["description"],
-                        "mandatory": sanitized["mandatory"]
-                    }).execute()
-
-            for deadline in extracted.get("deadlines", []):
-                sanitized = sanitize_deadline(deadline)
-                if sanitized and sanitized.get("deadline_date"):
-                    supabase.table("deadlines").insert({
-                        "program_id": program_id,
-                        "cycle": sanitized["cycle"],
-                        "deadline_date": sanitized["deadline_date"],
-                        "stage": sanitized["stage"]
-                    }).execute()
-
-            supabase.table("sources").insert({
-                "program_id": program_id,
-                "url": url,
-                "agent_model": "gemini-2.5-pro",
-                "raw_summary": json.dumps(extracted)[:10000],
-                "confidence_score": confidence
-            }).execute()
-
-            for issue in issues:
-                supabase.table("agent_reviews").insert({
-                    "program_id": program_id,
-                    "issue_type": "suspicious" if confidence < 0.5 else "missing_data",
-                    "note": issue,
-                    "severity": "high" if confidence < 0.5 else "low"
-                }).execute()
-
-            logger.debug(f"[BATCH] Success: {url} -> {program_id}")
-            return BatchItemResult(
-                url=url,
-                success=True,
-                program_id=program_id,
-                confidence=confidence,
-                issues=issues,
-                processing_time=time.time() - start_time
-            )
-
-        except Exception as e:
-            return BatchItemResult(
-                url=url,
-                success=False,
-                error=f"Database error: {str(e)}",
-                processing_time=time.time() - start_time
-            )
+        return {"url": url, "content": content, "start_time": start_time}
 
     except Exception as e:
-        logger.error(f"[BATCH] Unexpected error for {url}: {e}")
+        logger.error("[BATCH] Unexpected error for %s: %s", url, e)
         return BatchItemResult(
             url=url,
             success=False,
@@ -318,17 +320,62 @@ async def process_single_url(url: str, supabase) -> BatchItemResult:
         )
 
 
-@router.post("/batch-ingest", response_model=BatchIngestResponse)
-async def batch_ingest(request: BatchIngestRequest, authorization: str = Header(None)):
+async def _extract_batch_chunk(chunk: list[dict], verified_at: str) -> list[BatchItemResult | dict]:
+    """
+    Extract a chunk of scraped pages with one grouped Gemini call.
+
+    Returns, per page, a failed BatchItemResult or the prepared write payload
+    with its confidence/issues so every program in the batch can be written at once.
+    """
+    # Grouped calls produce several programs' worth of output - scale the ceiling with the chunk
+    timeout = BATCH_EXTRACT_TIMEOUT * len(chunk)
+    try:
+        await _throttle_extraction()
+        async with asyncio.timeout(timeout):
+            outcomes = await extract_with_gemini_batch([(item["url"], item["content"]) for item in chunk])
+    except TimeoutError:
+        outcomes = [TimeoutError(f"AI extraction timed out after {timeout:.0f}s")] * len(chunk)
+    except Exception as e:
+        outcomes = [e] * len(chunk)
+
+    prepared = []
+    for item, extracted in zip(chunk, outcomes):
+        if isinstance(extracted, BaseException):
+            error = str(extracted) if isinstance(extracted, TimeoutError) else f"AI extraction failed: {extracted}"
+            prepared.append(BatchItemResult(
+                url=item["url"],
+                success=False,
+                error=error,
+                processing_time=time.time() - item["start_time"]
+            ))
+            continue
+
+        confidence = extracted.get("confidence_score", 0.5)
+        issues = list(extracted.get("issues", []))
+
+        if confidence < 0.5:
+            issues.append("Low confidence extraction - manual review recommended")
+
+        prepared.append({
+            "url": item["url"],
+            "payload": _build_payload(extracted, item["url"], confidence, issues, verified_at),
+            "confidence": confidence,
+            "issues": issues,
+            "start_time": item["start_time"],
+        })
+    return prepared
+
+
+@router.post("/batch-ingest", response_model=BatchIngestResponse, dependencies=[Depends(verify_token)])
+async def batch_ingest(request: BatchIngestRequest):
     """Batch ingest multiple scholarship URLs concurrently."""
     start_time = time.time()
 
     logger.debug("=== BATCH INGEST START ===")
-    logger.debug(f"URLs to process: {len(request.urls)}")
-
-    verify_token(authorization)
+    logger.debug("URLs to process: %d", len(request.urls))
 
-    urls = [url.strip() for url in request.urls if url.strip()]
+    # Strip and de-duplicate, keeping the caller's order
+    urls = list(dict.fromkeys(url.strip() for url in request.urls if url.strip()))
 
     if not urls:
         raise HTTPException(status_code=400, detail="No valid URLs provided")
@@ -336,30 +383,92 @@ async def batch_ingest(request: BatchIngestRequest, authorization: str = Header(
     if len(urls) > 50:
         raise HTTPException(status_code=400, detail="Maximum 50 URLs per batch")
 
-    supabase = get_supabase()
+    # Skip URLs ingested recently (one lookup for the whole batch)
+    fresh = {} if request.force else await _fresh_sources(urls)
+    if fresh:
+        logger.debug("[BATCH] Skipping %d recently ingested URLs", len(fresh))
 
-    semaphore = asyncio.Semaphore(5)
-
-    async def process_with_semaphore(url: str) -> BatchItemResult:
-        async with semaphore:
-            return await process_single_url(url, supabase)
-
-    results = await asyncio.gather(
-        *[process_with_semaphore(url) for url in urls],
-        return_exceptions=False
-    )
+    results: list[BatchItemResult | dict | None] = [None] * len(urls)
+    queue: asyncio.Queue[tuple[int, str]] = asyncio.Queue()
+    for i, url in enumerate(urls):
+        if url in fresh:
+            results[i] = BatchItemResult(url=url, success=True, program_id=fresh[url], cached=True)
+        else:
+            queue.put_nowait((i, url))
+
+    async def worker():
+        # Only BATCH_WORKERS pages are being fetched at any time
+        while not queue.empty():
+            i, url = queue.get_nowait()
+            results[i] = await _scrape_batch_item(url)
+
+    # Phase 1: scrape with a fixed worker pool (each item reports its own failure)
+    async with asyncio.TaskGroup() as tg:
+        for _ in range(min(BATCH_WORKERS, queue.qsize())):
+            tg.create_task(worker())
+
+    # Phase 1b: extract the scraped pages in grouped Gemini calls, chunks running concurrently
+    scraped = [(i, item) for i, item in enumerate(results) if isinstance(item, dict)]
+    by_url = {item["url"]: (i, item) for i, item in scraped}
+    chunks = chunk_pages([(item["url"], item["content"]) for _, item in scraped])
+    logger.debug("[BATCH] Extracting %d pages in %d grouped calls", len(scraped), len(chunks))
+    # One verification timestamp for every program written by this batch
+    verified_at = utc_now_iso()
+
+    async def extract_chunk(chunk: list[tuple[str, str]]):
+        entries = [by_url[url] for url, _ in chunk]
+        prepared = await _extract_batch_chunk([item for _, item in entries], verified_at)
+        for (i, _), outcome in zip(entries, prepared):
+            results[i] = outcome
+
+    async with asyncio.TaskGroup() as tg:
+        for chunk in chunks:
+            tg.create_task(extract_chunk(chunk))
+
+    # Phase 2: write every extracted program in a single DB round trip
+    ready = [(i, item) for i, item in enumerate(results) if isinstance(item, dict)]
+    if ready:
+        supabase = await get_supabase_async()
+        try:
+            outcomes = await _persist_many(supabase, [item["payload"] for _, item in ready])
+            if len(outcomes) != len(ready):
+                raise ValueError(f"Expected {len(ready)} write results, got {len(outcomes)}")
+        except Exception as e:
+            logger.exception("[BATCH] Database error: %s", e)
+            outcomes = [{"error": str(e)}] * len(ready)
+
+        for (i, item), outcome in zip(ready, outcomes):
+            if outcome.get("program_id"):
+                logger.debug("[BATCH] Success: %s -> %s", item["url"], outcome["program_id"])
+                results[i] = BatchItemResult(
+                    url=item["url"],
+                    success=True,
+                    program_id=outcome["program_id"],
+                    confidence=item["confidence"],
+                    issues=item["issues"],
+                    processing_time=time.time() - item["start_time"]
+                )
+            else:
+                results[i] = BatchItemResult(
+                    url=item["url"],
+                    success=False,
+                    error=f"Database error: {outcome.get('error', 'unknown')}",
+                    processing_time=time.time() - item["start_time"]
+                )
 
     successful = sum(1 for r in results if r.success)
     failed = len(results) - successful
     total_time = time.time() - start_time
 
     logger.debug("=== BATCH INGEST COMPLETE ===")
-    logger.debug(f"Total: {len(results)}, Success: {successful}, Failed: {failed}, Time: {total_time:.2f}s")
+    logger.debug("Total: %d, Success: %d, Failed: %d, Time: %.2fs", len(results), successful, failed, total_time)
 
-    return BatchIngestResponse(
+    response = BatchIngestResponse.model_construct(
         total=len(results),
         successful=successful,
         failed=failed,
         results=results,
         total_time=total_time
     )
+    # Serialize directly with pydantic-core; skips FastAPI's re-validation of every result
+    return Response(content=response.model_dump_json(), media_type="application/json")
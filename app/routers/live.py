@@ -7,6 +7,7 @@ Uses Gemini Live API for real-time bidirectional audio streaming.
 import logging
 import base64
 import asyncio
+import orjson
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from google.genai import types as genai_types
 
@@ -16,9 +17,18 @@ from ..prompts import LIVE_API_SYSTEM_INSTRUCTION
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Gemini Live output / expected input audio formats
+OUTPUT_SAMPLE_RATE = 24000
+INPUT_MIME_TYPE = "audio/pcm;rate=16000"
+
+# Inbound audio is coalesced into ~100 ms frames (16 kHz * 16-bit mono = 3200 bytes)
+# before it goes to Gemini; a flusher covers pauses shorter than a full frame
+AUDIO_FLUSH_BYTES = 3200
+AUDIO_FLUSH_INTERVAL = 0.1
+
 
 @router.websocket("/live/ada")
-async def websocket_ada_live(websocket: WebSocket):
+async def websocket_ada_live(websocket: WebSocket, binary: bool = False):
     """
     WebSocket endpoint for real-time speech-to-speech with Ada.
 
@@ -28,6 +38,12 @@ async def websocket_ada_live(websocket: WebSocket):
     - Server sends: {"type": "audio", "data": "<base64 PCM 24kHz>"}
     - Server sends: {"type": "transcript", "data": "<text>"}
     - Server sends: {"type": "turn_complete"}
+
+    Binary mode (/live/ada?binary=true):
+    - Server first sends: {"type": "audio_header", "sample_rate": 24000, "encoding": "pcm_s16le"}
+    - Server audio is sent as raw PCM in binary frames (no base64/JSON)
+    - Client may send raw PCM 16kHz as binary frames instead of {"type": "audio"}
+    - Control and transcript messages stay JSON text frames
     """
     logger.debug("=" * 60)
     logger.debug("WEBSOCKET CONNECTION ATTEMPT - /live/ada")
@@ -39,6 +55,10 @@ async def websocket_ada_live(websocket: WebSocket):
     logger.debug(f"WebSocket client info: {websocket.client}")
 
     receive_task = None
+    flush_task = None
+    # Checked once per session; the per-frame debug logs below are skipped entirely at INFO
+    debug = logger.isEnabledFor(logging.DEBUG)
+    logger.debug(f"Binary audio frames: {binary}")
 
     try:
         logger.debug("Building LiveConnectConfig...")
@@ -83,16 +103,23 @@ async def websocket_ada_live(websocket: WebSocket):
                 logger.debug(f"[{session_id}] Starting Gemini receive task...")
                 try:
                     async for response in live_session.receive():
-                        logger.debug(f"[{session_id}] Received response from Gemini: {type(response)}")
+                        if debug:
+                            logger.debug(f"[{session_id}] Received response from Gemini: {type(response)}")
                         if response.server_content:
-                            logger.debug(f"[{session_id}] Server content received")
+                            if debug:
+                                logger.debug(f"[{session_id}] Server content received")
                             # Handle model turn (audio response)
                             if response.server_content.model_turn:
-                                logger.debug(f"[{session_id}] Model turn - processing audio parts")
+                                if debug:
+                                    logger.debug(f"[{session_id}] Model turn - processing audio parts")
                                 for part in response.server_content.model_turn.parts:
                                     if part.inline_data and part.inline_data.data:
+                                        if binary:
+                                            await websocket.send_bytes(part.inline_data.data)
+                                            continue
                                         audio_b64 = base64.b64encode(part.inline_data.data).decode('utf-8')
-                                        logger.debug(f"[{session_id}] Sending audio chunk: {len(audio_b64)} chars")
+                                        if debug:
+                                            logger.debug(f"[{session_id}] Sending audio chunk: {len(audio_b64)} chars")
                                         await websocket.send_json({
                                             "type": "audio",
                                             "data": audio_b64
@@ -100,7 +127,8 @@ async def websocket_ada_live(websocket: WebSocket):
 
                             # Handle output transcription
                             if response.server_content.output_transcription:
-                                logger.debug(f"[{session_id}] Transcript: {response.server_content.output_transcription.text[:50]}...")
+                                if debug:
+                                    logger.debug(f"[{session_id}] Transcript: {response.server_content.output_transcription.text[:50]}...")
                                 await websocket.send_json({
                                     "type": "transcript",
                                     "data": response.server_content.output_transcription.text
@@ -121,8 +149,50 @@ async def websocket_ada_live(websocket: WebSocket):
                 except Exception as e:
                     logger.error(f"Error receiving from Gemini: {e}")
 
+            # Describe the raw audio frames before any arrive
+            if binary:
+                await websocket.send_json({
+                    "type": "audio_header",
+                    "sample_rate": OUTPUT_SAMPLE_RATE,
+                    "encoding": "pcm_s16le"
+                })
+
+            loop = asyncio.get_running_loop()
+            pcm_buf = bytearray()
+            last_flush = loop.time()
+
+            async def flush_audio():
+                nonlocal last_flush
+                last_flush = loop.time()
+                if not pcm_buf:
+                    return
+                # Snapshot + clear before awaiting so concurrent appends land in the next frame
+                chunk = bytes(pcm_buf)
+                pcm_buf.clear()
+                await live_session.send(input=genai_types.Blob(
+                    data=chunk,
+                    mime_type=INPUT_MIME_TYPE
+                ))
+
+            async def queue_audio(audio_data: bytes):
+                pcm_buf.extend(audio_data)
+                if len(pcm_buf) >= AUDIO_FLUSH_BYTES or loop.time() - last_flush > AUDIO_FLUSH_INTERVAL:
+                    await flush_audio()
+
+            async def periodic_flush():
+                try:
+                    while True:
+                        await asyncio.sleep(AUDIO_FLUSH_INTERVAL)
+                        if pcm_buf and loop.time() - last_flush >= AUDIO_FLUSH_INTERVAL:
+                            await flush_audio()
+                except asyncio.CancelledError:
+                    pass
+                except Exception as e:
+                    logger.error(f"Error flushing audio to Gemini: {e}")
+
             # Start receive task
             receive_task = asyncio.create_task(receive_from_gemini())
+            flush_task = asyncio.create_task(periodic_flush())
             logger.debug(f"[{session_id}] Receive task started")
 
             # Send initial greeting
@@ -134,25 +204,35 @@ async def websocket_ada_live(websocket: WebSocket):
             logger.debug(f"[{session_id}] Entering main client message loop...")
             while True:
                 try:
-                    data = await websocket.receive_json()
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(message.get("code", 1000))
+
+                    # Raw PCM binary frame - no base64 or JSON to unwrap
+                    if message.get("bytes") is not None:
+                        await queue_audio(message["bytes"])
+                        continue
+
+                    data = orjson.loads(message.get("text") or "{}")
                     msg_type = data.get("type")
-                    logger.debug(f"[{session_id}] Received from client: type={msg_type}")
+                    if debug:
+                        logger.debug(f"[{session_id}] Received from client: type={msg_type}")
 
                     if msg_type == "audio":
                         audio_data = base64.b64decode(data.get("data", ""))
-                        logger.debug(f"[{session_id}] Sending audio to Gemini: {len(audio_data)} bytes")
-                        await live_session.send(input=genai_types.Blob(
-                            data=audio_data,
-                            mime_type="audio/pcm;rate=16000"
-                        ))
+                        if debug:
+                            logger.debug(f"[{session_id}] Queueing audio for Gemini: {len(audio_data)} bytes")
+                        await queue_audio(audio_data)
 
                     elif msg_type == "text":
                         text = data.get("data", "")
                         logger.debug(f"[{session_id}] Sending text to Gemini: {text[:50]}...")
+                        await flush_audio()
                         await live_session.send(input=text, end_of_turn=True)
 
                     elif msg_type == "end_turn":
                         logger.debug(f"[{session_id}] End turn signal")
+                        await flush_audio()
                         await live_session.send(input="", end_of_turn=True)
 
                 except WebSocketDisconnect:
@@ -170,6 +250,8 @@ async def websocket_ada_live(websocket: WebSocket):
             pass
 
     finally:
+        if flush_task:
+            flush_task.cancel()
         if receive_task:
             receive_task.cancel()
         logger.info(f"WebSocket cleanup complete: {session_id}")
@@ -2,7 +2,8 @@
 Onboarding router - /onboarding/chat endpoint.
 """
 import logging
-import json
+import re
+import orjson
 from google.genai import types
 
 from fastapi import APIRouter
@@ -12,11 +13,23 @@ from ..models.schemas import (
     OnboardingChatRequest,
     OnboardingChatResponse,
 )
-from ..prompts import ONBOARDING_PROMPT
+from ..prompts import ONBOARDING_PROMPT, ONBOARDING_SYSTEM_INSTRUCTION
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Canned questions used when Gemini fails (also prewarmed in the TTS cache at startup)
+FALLBACK_QUESTIONS = {
+    0: "What's your name and where are you from?",
+    1: "Great! What are you currently studying or what did you last complete? (e.g., BSc in Computer Science)",
+    2: "What degree are you hoping to pursue next - Bachelor's, Master's, or PhD? And which countries interest you?",
+    3: "Do you have any work experience? And roughly what's your GPA?",
+    4: "Last question - any special circumstances that might help your application? (First-gen student, financial need, etc.)",
+}
+FALLBACK_DONE = "Thanks for sharing! Let me find scholarships for you..."
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
 
 @router.post("/onboarding/chat", response_model=OnboardingChatResponse)
 async def onboarding_chat(request: OnboardingChatRequest):
@@ -24,19 +37,22 @@ async def onboarding_chat(request: OnboardingChatRequest):
     logger.debug("=" * 50)
     logger.debug("ONBOARDING CHAT REQUEST")
     logger.debug("=" * 50)
-    logger.debug(f"Current step: {request.current_step}")
-    logger.debug(f"Messages count: {len(request.messages)}")
-    logger.debug(f"Existing extracted data: {request.extracted_data}")
+    logger.debug("Current step: %s", request.current_step)
+    logger.debug("Messages count: %d", len(request.messages))
+    logger.debug("Existing extracted data: %s", request.extracted_data)
     
     try:
         # Format messages for prompt
         messages_text = "\n".join([
             f"{m.role.upper()}: {m.content}" for m in request.messages
         ])
-        logger.debug(f"Formatted messages: {messages_text[:200]}...")
+        logger.debug("Formatted messages: %.200s...", messages_text)
 
-        # Format extracted data
-        extracted_text = json.dumps(request.extracted_data, indent=2) if request.extracted_data else "None yet"
+        # Format extracted data (compact JSON - indentation only costs input tokens)
+        extracted_text = (
+            orjson.dumps(request.extracted_data).decode()
+            if request.extracted_data else "None yet"
+        )
 
         prompt = ONBOARDING_PROMPT.format(
             messages=messages_text,
@@ -45,27 +61,27 @@ async def onboarding_chat(request: OnboardingChatRequest):
         )
 
         logger.debug("Calling Gemini for onboarding response...")
-        response = gemini_client.models.generate_content(
+        response = await gemini_client.aio.models.generate_content(
             model="gemini-2.5-pro",
             contents=prompt,
             config=types.GenerateContentConfig(
+                system_instruction=ONBOARDING_SYSTEM_INSTRUCTION,
                 response_mime_type="application/json",
                 max_output_tokens=1024,
                 temperature=0.7
             )
         )
 
-        logger.debug(f"Gemini response received, length: {len(response.text)}")
-        result_text = response.text.strip()
-        if result_text.startswith("```"):
-            result_text = result_text.split("```")[1]
-            if result_text.startswith("json"):
-                result_text = result_text[4:]
-        result_text = result_text.strip()
+        response_text = response.text or ""
+        logger.debug("Gemini response received, length: %d", len(response_text))
+        # Strip an optional ```json fence in one pass
+        m = _FENCE_RE.match(response_text)
+        result_text = m.group(1) if m else response_text.strip()
 
-        result = json.loads(result_text)
+        result = orjson.loads(result_text)
 
-        logger.debug(f"Parsed result: response={result.get('response', '')[:50]}..., next_step={result.get('next_step')}, is_complete={result.get('is_complete')}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Parsed result: response={result.get('response', '')[:50]}..., next_step={result.get('next_step')}, is_complete={result.get('is_complete')}")
         
         # Merge new extracted data with existing
         merged_data = {**request.extracted_data}
@@ -74,7 +90,7 @@ async def onboarding_chat(request: OnboardingChatRequest):
                 if value is not None and value != "" and value != []:
                     merged_data[key] = value
 
-        logger.debug(f"Merged extracted data: {merged_data}")
+        logger.debug("Merged extracted data: %s", merged_data)
         logger.debug("Onboarding chat completed successfully")
 
         return OnboardingChatResponse(
@@ -90,14 +106,7 @@ async def onboarding_chat(request: OnboardingChatRequest):
         logger.error(f"Traceback: {traceback.format_exc()}")
         # Smart fallback based on step
         step = request.current_step
-        fallback_questions = {
-            0: "What's your name and where are you from?",
-            1: "Great! What are you currently studying or what did you last complete? (e.g., BSc in Computer Science)",
-            2: "What degree are you hoping to pursue next - Bachelor's, Master's, or PhD? And which countries interest you?",
-            3: "Do you have any work experience? And roughly what's your GPA?",
-            4: "Last question - any special circumstances that might help your application? (First-gen student, financial need, etc.)",
-        }
-        fallback_response = fallback_questions.get(step, "Thanks for sharing! Let me find scholarships for you...")
+        fallback_response = FALLBACK_QUESTIONS.get(step, FALLBACK_DONE)
 
         return OnboardingChatResponse(
             response=fallback_response,
@@ -7,7 +7,8 @@ For real-time speech-to-speech, use the Live API WebSocket at /live/ada.
 import logging
 import base64
 import asyncio
-import traceback
+import hashlib
+from collections import OrderedDict
 from fastapi import APIRouter, HTTPException
 from google.genai import types
 
@@ -21,12 +22,80 @@ router = APIRouter()
 # Female: Kore, Aoede, Leda, Zephyr, Charon, Fenrir
 # Male: Puck, Orus, etc.
 
+# Synthesized audio kept in memory, keyed by sha256(voice|style|text); LRU-bounded
+TTS_CACHE_MAX_ENTRIES = 256
+_TTS_CACHE: OrderedDict[str, TTSResponse] = OrderedDict()
+
+# Per-call ceiling so one hung synthesis can't eat the whole retry budget
+TTS_CALL_TIMEOUT = 8.0
+
+# Errors worth another voice/attempt; anything else (400/401/403/429) fails fast
+_RETRYABLE_CODES = {500, 502, 503, 504}
+_RETRYABLE_MARKERS = ("500", "INTERNAL", "UNAVAILABLE", "DEADLINE_EXCEEDED")
+
+
+def _is_retryable(error: Exception) -> bool:
+    """True for transient Gemini failures (server errors and timeouts)."""
+    if isinstance(error, TimeoutError):
+        return True
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code in _RETRYABLE_CODES
+    error_str = str(error)
+    return any(marker in error_str for marker in _RETRYABLE_MARKERS)
+
+
+def _cache_key(voice: str, style: str | None, text: str) -> str:
+    return hashlib.sha256(f"{voice}|{style or ''}|{text}".encode()).hexdigest()
+
+
+def _cache_get(key: str) -> TTSResponse | None:
+    response = _TTS_CACHE.get(key)
+    if response is not None:
+        _TTS_CACHE.move_to_end(key)
+    return response
+
+
+def _cache_put(key: str, response: TTSResponse):
+    _TTS_CACHE[key] = response
+    _TTS_CACHE.move_to_end(key)
+    while len(_TTS_CACHE) > TTS_CACHE_MAX_ENTRIES:
+        _TTS_CACHE.popitem(last=False)
+
 
 @router.post("/tts", response_model=TTSResponse)
 async def text_to_speech(request: TTSRequest):
     """Convert text to speech using Gemini 2.5 Flash TTS."""
-    logger.info(f"TTS request: {len(request.text)} chars, voice={request.voice}")
-
+    logger.info("TTS request: %d chars, voice=%s", len(request.text), request.voice)
+
+    # TTS is a pure function of (voice, style, text) - repeat prompts are served from memory
+    key = _cache_key(request.voice, request.style, request.text)
+    cached = _cache_get(key)
+    if cached is not None:
+        logger.info("TTS cache hit: voice=%s", request.voice)
+        return cached
+
+    response, voice = await _synthesize(request)
+    # A fallback voice's audio must not be served later as the requested voice
+    if voice == request.voice:
+        _cache_put(key, response)
+    return response
+
+
+async def prewarm_tts_cache(texts, voice: str = "Kore"):
+    """Synthesize canned prompts ahead of time so their first request is instant."""
+    for text in texts:
+        try:
+            await text_to_speech(TTSRequest(text=text, voice=voice))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("TTS prewarm failed for %r: %s", text[:30], e)
+    logger.info("TTS cache prewarmed: %d entries", len(_TTS_CACHE))
+
+
+async def _synthesize(request: TTSRequest) -> tuple[TTSResponse, str]:
+    """Call Gemini TTS with voice fallback and retries; returns (audio, voice actually used)."""
     if not gemini_client:
         logger.error("Gemini client not initialized")
         raise HTTPException(status_code=500, detail="TTS service unavailable")
@@ -35,34 +104,35 @@ async def text_to_speech(request: TTSRequest):
     retry_delay = 1.0
     last_error = None
 
-    # Voices to try in order (fallback if first fails)
-    voices_to_try = [request.voice, "Kore", "Puck"]
+    # Voices to try in order (fallback if first fails); skip duplicates of the requested one
+    voices_to_try = list(dict.fromkeys([request.voice, "Kore", "Puck"]))
+
+    # Build the TTS prompt
+    if request.style:
+        tts_prompt = f"Say {request.style}: {request.text}"
+    else:
+        tts_prompt = f"Say cheerfully and warmly: {request.text}"
 
     for attempt in range(max_retries):
         for voice_name in voices_to_try:
             try:
-                # Build the TTS prompt
-                if request.style:
-                    tts_prompt = f"Say {request.style}: {request.text}"
-                else:
-                    tts_prompt = f"Say cheerfully and warmly: {request.text}"
-
-                logger.debug(f"TTS attempt {attempt + 1}, voice={voice_name}: {tts_prompt[:50]}...")
-
-                response = gemini_client.models.generate_content(
-                    model="gemini-2.5-flash-preview-tts",
-                    contents=tts_prompt,
-                    config=types.GenerateContentConfig(
-                        response_modalities=["AUDIO"],
-                        speech_config=types.SpeechConfig(
-                            voice_config=types.VoiceConfig(
-                                prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                                    voice_name=voice_name,
+                logger.debug("TTS attempt %d, voice=%s: %s...", attempt + 1, voice_name, tts_prompt[:50])
+
+                async with asyncio.timeout(TTS_CALL_TIMEOUT):
+                    response = await gemini_client.aio.models.generate_content(
+                        model="gemini-2.5-flash-preview-tts",
+                        contents=tts_prompt,
+                        config=types.GenerateContentConfig(
+                            response_modalities=["AUDIO"],
+                            speech_config=types.SpeechConfig(
+                                voice_config=types.VoiceConfig(
+                                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                                        voice_name=voice_name,
+                                    )
                                 )
-                            )
-                        ),
+                            ),
+                        )
                     )
-                )
 
                 if response.candidates and response.candidates[0].content.parts:
                     audio_data = response.candidates[0].content.parts[0].inline_data.data
@@ -72,33 +142,33 @@ async def text_to_speech(request: TTSRequest):
                     else:
                         audio_base64 = audio_data
 
-                    logger.info(f"TTS generated: {len(audio_base64)} chars, voice={voice_name}")
+                    logger.info("TTS generated: %d chars, voice=%s", len(audio_base64), voice_name)
 
                     return TTSResponse(
                         audio_base64=audio_base64,
                         format="pcm",
                         sample_rate=24000
-                    )
+                    ), voice_name
                 else:
-                    logger.warning(f"No audio data in response for voice {voice_name}")
+                    logger.warning("No audio data in response for voice %s", voice_name)
                     continue
 
             except Exception as e:
-                error_str = str(e)
-                logger.warning(f"TTS attempt {attempt + 1} with voice {voice_name} failed: {error_str}")
+                logger.warning("TTS attempt %d with voice %s failed: %s: %s", attempt + 1, voice_name, type(e).__name__, e)
                 last_error = e
 
-                # If 500 error from Google, try next voice
-                if "500" in error_str or "INTERNAL" in error_str:
+                # Server-side/transient failures: try the next voice
+                if _is_retryable(e):
                     continue
 
-                break
+                # Bad request, auth or quota errors fail the same way for every voice and retry
+                logger.error("TTS failed with non-retryable error: %s", e)
+                raise HTTPException(status_code=502, detail=f"TTS failed: {e}")
 
         # Wait before next retry
         if attempt < max_retries - 1:
             await asyncio.sleep(retry_delay)
             retry_delay *= 2
 
-    logger.error(f"TTS failed after {max_retries} attempts: {last_error}")
-    logger.error(traceback.format_exc())
+    logger.error("TTS failed after %d attempts: %s", max_retries, last_error)
     raise HTTPException(status_code=500, detail=f"TTS failed after retries: {str(last_error)}")
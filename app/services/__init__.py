@@ -2,12 +2,16 @@
 Services package initialization.
 """
 from .scraper import fetch_page_content
-from .extraction import extract_with_gemini, sanitize_program_data
+from .extraction import extract_with_gemini, extract_with_gemini_batch, sanitize_program_data
 from .eligibility import analyze_eligibility_batch
+from .programs import fetch_active_programs, invalidate_programs_cache
 
 __all__ = [
     "fetch_page_content",
     "extract_with_gemini",
+    "extract_with_gemini_batch",
     "sanitize_program_data",
     "analyze_eligibility_batch",
+    "fetch_active_programs",
+    "invalidate_programs_cache",
 ]
@@ -1,38 +1,306 @@
 """
 Eligibility checking service using Gemini AI.
 """
+import asyncio
+import io
 import logging
-import json
+from collections import Counter
+import orjson
 from google.genai import types
+from pydantic import TypeAdapter
 
+from ..config import GEMINI_CONCURRENCY
 from ..dependencies import gemini_client
-from ..prompts import ELIGIBILITY_PROMPT
-from ..models.schemas import UserProfile, ProgramMatch
+from ..prompts import (
+    ELIGIBILITY_SYSTEM_INSTRUCTION,
+    ELIGIBILITY_PROFILE_PROMPT,
+    ELIGIBILITY_PROMPT,
+    ELIGIBILITY_PROGRAM_BLOCK,
+)
+from .llm import generate_text
+from ..models.schemas import UserProfile, ProgramMatch, EligibilityAnalysis
 
 logger = logging.getLogger(__name__)
 
+# Programs scored per Gemini call, and how many calls may be in flight at once
+ELIGIBILITY_BATCH_SIZE = 8
+ELIGIBILITY_MODEL = "gemini-2.5-pro"
+# Structured output: one EligibilityAnalysis per program in the group
+ELIGIBILITY_SCHEMA = TypeAdapter(list[EligibilityAnalysis]).json_schema()
+_GEMINI_SEM = asyncio.Semaphore(GEMINI_CONCURRENCY)
+
+# Display names for UserProfile.target_degree
+TARGET_DEGREE_LABELS = {
+    'bachelor': "Bachelor's degree",
+    'masters': "Master's degree",
+    'phd': "PhD/Doctorate",
+    'postdoc': "Postdoctoral fellowship",
+}
+
+# Batch API polling (use_batch=True)
+BATCH_POLL_SECONDS = 30
+# Gemini targets a 24h turnaround for batch jobs; give up (and cancel) after that
+BATCH_MAX_WAIT_SECONDS = 24 * 3600
+BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+
+def _format_program(index: int, program: dict) -> str:
+    """Render one program as a numbered block for the grouped prompt."""
+    # Build eligibility rules text
+    rules_text = "None specified"
+    if program.get('eligibility_rules'):
+        rules = program['eligibility_rules']
+        if isinstance(rules, list) and rules:
+            rules_text = "\n".join([
+                f"- {r.get('rule_type', 'other')}: {r.get('value', {})} (confidence: {r.get('confidence', 'unknown')})"
+                for r in rules
+            ])
+
+    # Format age requirements
+    age_req = "Not specified"
+    if program.get('age_min') or program.get('age_max'):
+        if program.get('age_min') and program.get('age_max'):
+            age_req = f"{program['age_min']}-{program['age_max']} years"
+        elif program.get('age_max'):
+            age_req = f"Up to {program['age_max']} years"
+        else:
+            age_req = f"{program['age_min']}+ years"
+
+    # Format GPA requirements
+    gpa_req = "Not specified"
+    if program.get('gpa_min'):
+        gpa_req = f"Minimum {program['gpa_min']} GPA"
+
+    return ELIGIBILITY_PROGRAM_BLOCK.format(
+        index=index,
+        name=program.get('name', 'Unknown'),
+        provider=program.get('provider', 'Unknown'),
+        level=program.get('level', 'Unknown'),
+        funding_type=program.get('funding_type', 'Unknown'),
+        description=program.get('description') or 'No description available',
+        countries_eligible=', '.join(program.get('countries_eligible') or []) or 'Not specified',
+        countries_of_study=', '.join(program.get('countries_of_study') or []) or 'Not specified',
+        fields=', '.join(program.get('fields') or []) or 'All fields',
+        who_wins=program.get('who_wins') or 'Not specified',
+        age_requirements=age_req,
+        gpa_requirements=gpa_req,
+        eligibility_rules=rules_text,
+    )
+
+
+def _build_match(program: dict, analysis: dict) -> ProgramMatch:
+    """Turn one LLM analysis object into a ProgramMatch."""
+    return ProgramMatch(
+        program_id=program['id'],
+        program_name=program.get('name', 'Unknown'),
+        provider=program.get('provider', 'Unknown'),
+        level=program.get('level', 'unknown'),
+        funding_type=program.get('funding_type', 'unknown'),
+        match_score=min(100, max(0, int(analysis.get('match_score', 50)))),
+        status=analysis.get('status', 'maybe'),
+        explanation=analysis.get('explanation', 'Unable to analyze this program.'),
+        strengths=analysis.get('strengths', []),
+        concerns=analysis.get('concerns', []),
+        action_items=analysis.get('action_items', [])
+    )
+
+
+def _fallback_match(program: dict) -> ProgramMatch:
+    """Neutral result used when a program couldn't be analyzed."""
+    return ProgramMatch(
+        program_id=program['id'],
+        program_name=program.get('name', 'Unknown'),
+        provider=program.get('provider', 'Unknown'),
+        level=program.get('level', 'unknown'),
+        funding_type=program.get('funding_type', 'unknown'),
+        match_score=50,
+        status='maybe',
+        explanation='We couldn\'t fully analyze this program. Please review the details manually.',
+        strengths=[],
+        concerns=['Automated analysis unavailable'],
+        action_items=['Review program requirements directly on their website']
+    )
+
+
+def _group_prompt(group: list[dict]) -> str:
+    """Build the program-specific part of the prompt for one group."""
+    return ELIGIBILITY_PROMPT.format(
+        count=len(group),
+        programs="\n".join(_format_program(i + 1, program) for i, program in enumerate(group)),
+    )
+
+
+def _group_config(group: list[dict]) -> types.GenerateContentConfig:
+    """Generation settings for one group (output budget scales with the group)."""
+    return types.GenerateContentConfig(
+        system_instruction=ELIGIBILITY_SYSTEM_INSTRUCTION,
+        response_mime_type="application/json",
+        response_json_schema=ELIGIBILITY_SCHEMA,
+        max_output_tokens=1024 * len(group),
+        temperature=0.3
+    )
+
+
+def _parse_group_response(group_idx: int, group: list[dict], text: str) -> list[ProgramMatch]:
+    """Map a grouped JSON response back onto its programs, falling back per program."""
+    try:
+        # Schema-constrained output is bare JSON - no markdown fences to strip
+        analyses = orjson.loads(text)
+        if isinstance(analyses, dict):
+            analyses = [analyses]
+        if not isinstance(analyses, list):
+            raise ValueError(f"Expected a JSON array, got {type(analyses).__name__}")
+    except Exception as e:
+        logger.error("[group %d] Error parsing analysis for programs %s: %s: %s", group_idx + 1, [p.get('id') for p in group], type(e).__name__, e)
+        return [_fallback_match(program) for program in group]
+
+    # Map results back by their 1-based index; fall back to position when missing
+    by_index = {}
+    for pos, analysis in enumerate(analyses):
+        if not isinstance(analysis, dict):
+            continue
+        index = analysis.get('index')
+        if not isinstance(index, int) or not 1 <= index <= len(group) or index in by_index:
+            index = pos + 1
+        by_index.setdefault(index, analysis)
+
+    matches = []
+    for i, program in enumerate(group, start=1):
+        analysis = by_index.get(i)
+        if analysis is None:
+            logger.error("[group %d] No analysis returned for program %s", group_idx + 1, program.get('id'))
+            matches.append(_fallback_match(program))
+            continue
+        try:
+            matches.append(_build_match(program, analysis))
+            logger.debug("[group %d] %s: status=%s, score=%s", group_idx + 1, program.get('name', 'Unknown'), analysis.get('status'), analysis.get('match_score'))
+        except Exception as e:
+            logger.error("[group %d] Error building match for program %s: %s: %s", group_idx + 1, program.get('id'), type(e).__name__, e)
+            matches.append(_fallback_match(program))
+    return matches
+
+
+async def _analyze_group(group_idx: int, group: list[dict], profile_prompt: str) -> list[ProgramMatch]:
+    """Score one group of programs with a single Gemini call."""
+    try:
+        # Shared prefix first (instructions, then profile) so implicit caching can reuse it
+        prompt = [profile_prompt, _group_prompt(group)]
+
+        logger.debug("[group %d] Sending %d programs to Gemini for analysis...", group_idx + 1, len(group))
+        async with _GEMINI_SEM:
+            text = await generate_text(
+                model=ELIGIBILITY_MODEL,
+                contents=prompt,
+                config=_group_config(group)
+            )
+        logger.debug("[group %d] Gemini response received, parsing...", group_idx + 1)
+    except Exception as e:
+        logger.error("[group %d] Error analyzing programs %s: %s: %s", group_idx + 1, [p.get('id') for p in group], type(e).__name__, e)
+        return [_fallback_match(program) for program in group]
+
+    return _parse_group_response(group_idx, group, text)
+
+
+# ============================================================================
+# BATCH MODE (offline re-scoring)
+# ============================================================================
+
+async def _analyze_groups_batch_mode(groups: list[list[dict]], profile_prompt: str) -> list[list[ProgramMatch]]:
+    """
+    Score every group through the Gemini Batch API.
+
+    Half the cost of interactive calls and outside the per-minute quota, but
+    jobs take minutes to hours - only for offline work such as nightly re-scoring.
+    """
+    lines = []
+    for group_idx, group in enumerate(groups):
+        config = _group_config(group)
+        lines.append(orjson.dumps({
+            "key": f"group_{group_idx}",
+            "request": {
+                "systemInstruction": {"parts": [{"text": ELIGIBILITY_SYSTEM_INSTRUCTION}]},
+                "contents": [{"role": "user", "parts": [{"text": profile_prompt}, {"text": _group_prompt(group)}]}],
+                "generationConfig": {
+                    "responseMimeType": config.response_mime_type,
+                    "responseJsonSchema": config.response_json_schema,
+                    "maxOutputTokens": config.max_output_tokens,
+                    "temperature": config.temperature,
+                },
+            },
+        }))
+
+    uploaded = await gemini_client.aio.files.upload(
+        file=io.BytesIO(b"\n".join(lines)),
+        config=types.UploadFileConfig(display_name="eligibility-batch", mime_type="jsonl")
+    )
+    try:
+        job = await gemini_client.aio.batches.create(
+            model=ELIGIBILITY_MODEL,
+            src=uploaded.name,
+            config=types.CreateBatchJobConfig(display_name="eligibility-batch")
+        )
+        logger.debug("Submitted eligibility batch job %s (%d groups)", job.name, len(groups))
+
+        try:
+            async with asyncio.timeout(BATCH_MAX_WAIT_SECONDS):
+                while job.state.name not in BATCH_DONE_STATES:
+                    await asyncio.sleep(BATCH_POLL_SECONDS)
+                    job = await gemini_client.aio.batches.get(name=job.name)
+        except TimeoutError:
+            await gemini_client.aio.batches.cancel(name=job.name)
+            raise Exception(f"Eligibility batch job {job.name} still {job.state.name} after {BATCH_MAX_WAIT_SECONDS}s")
+    finally:
+        # The job has read its input by the time it finishes (or is cancelled)
+        try:
+            await gemini_client.aio.files.delete(name=uploaded.name)
+        except Exception as e:
+            logger.warning("Failed to delete batch input file %s: %s", uploaded.name, e)
+
+    if job.state.name != "JOB_STATE_SUCCEEDED":
+        raise Exception(f"Eligibility batch job {job.name} ended in {job.state.name}")
+
+    texts: dict[str, str] = {}
+    raw = await gemini_client.aio.files.download(file=job.dest.file_name)
+    for line in raw.splitlines():
+        if not line.strip():
+            continue
+        row = orjson.loads(line)
+        try:
+            parts = row["response"]["candidates"][0]["content"]["parts"]
+            texts[row["key"]] = "".join(part.get("text", "") for part in parts)
+        except (KeyError, IndexError, TypeError):
+            logger.error("Batch row %s has no response: %s", row.get('key'), row.get('error'))
+
+    return [
+        _parse_group_response(group_idx, group, texts[f"group_{group_idx}"])
+        if f"group_{group_idx}" in texts else [_fallback_match(program) for program in group]
+        for group_idx, group in enumerate(groups)
+    ]
+
+
+async def analyze_eligibility_batch(profile: UserProfile, programs: list[dict], use_batch: bool = False) -> list[ProgramMatch]:
+    """
+    Analyze eligibility for multiple programs using LLM.
+
+    use_batch=True submits the groups as one Gemini Batch API job instead of
+    interactive calls (cheaper, but slow - never for request/response paths).
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("=" * 50)
+        logger.debug("STARTING ELIGIBILITY BATCH ANALYSIS")
+        logger.debug("=" * 50)
+        logger.debug("Total programs to analyze: %d", len(programs))
+        logger.debug("Profile nationality: %s", profile.nationality)
+        logger.debug("Profile degree: %s", profile.degree)
+        logger.debug("Target degree: %s", profile.target_degree)
+        logger.debug("Profile GPA: %s", profile.gpa)
+        logger.debug("Profile age: %s", profile.age)
+        logger.debug("Profile field: %s", profile.field_of_study)
 
-async def analyze_eligibility_batch(profile: UserProfile, programs: list[dict]) -> list[ProgramMatch]:
-    """Analyze eligibility for multiple programs using LLM."""
-    logger.debug("=" * 50)
-    logger.debug("STARTING ELIGIBILITY BATCH ANALYSIS")
-    logger.debug("=" * 50)
-    logger.debug(f"Total programs to analyze: {len(programs)}")
-    logger.debug(f"Profile nationality: {profile.nationality}")
-    logger.debug(f"Profile degree: {profile.degree}")
-    logger.debug(f"Target degree: {profile.target_degree}")
-    logger.debug(f"Profile GPA: {profile.gpa}")
-    logger.debug(f"Profile age: {profile.age}")
-    logger.debug(f"Profile field: {profile.field_of_study}")
-    
     results = []
 
-    target_degree_label = {
-        'bachelor': "Bachelor's degree",
-        'masters': "Master's degree",
-        'phd': "PhD/Doctorate",
-        'postdoc': "Postdoctoral fellowship"
-    }.get(profile.target_degree, profile.target_degree or 'Not specified')
+    target_degree_label = TARGET_DEGREE_LABELS.get(profile.target_degree, profile.target_degree or 'Not specified')
 
     profile_text = f"""
 - Nationality: {profile.nationality}
@@ -48,104 +316,41 @@ async def analyze_eligibility_batch(profile: UserProfile, programs: list[dict])
 - Disability: {'Yes' if profile.has_disability else 'No'}
 - Additional Info: {profile.additional_info or 'None'}
 """
+    # Formatted once; every group's prompt starts with this same prefix
+    profile_prompt = ELIGIBILITY_PROFILE_PROMPT.format(
+        profile=profile_text,
+        target_degree_upper=target_degree_label.upper()
+    )
 
-    for idx, program in enumerate(programs):
-        try:
-            logger.debug(f"[{idx+1}/{len(programs)}] Analyzing program: {program.get('name', 'Unknown')} (ID: {program.get('id')})")
-            # Build eligibility rules text
-            rules_text = "None specified"
-            if program.get('eligibility_rules'):
-                rules = program['eligibility_rules']
-                if isinstance(rules, list) and rules:
-                    rules_text = "\n".join([
-                        f"- {r.get('rule_type', 'other')}: {r.get('value', {})} (confidence: {r.get('confidence', 'unknown')})"
-                        for r in rules
-                    ])
-
-            # Format age requirements
-            age_req = "Not specified"
-            if program.get('age_min') or program.get('age_max'):
-                if program.get('age_min') and program.get('age_max'):
-                    age_req = f"{program['age_min']}-{program['age_max']} years"
-                elif program.get('age_max'):
-                    age_req = f"Up to {program['age_max']} years"
-                else:
-                    age_req = f"{program['age_min']}+ years"
-
-            # Format GPA requirements
-            gpa_req = "Not specified"
-            if program.get('gpa_min'):
-                gpa_req = f"Minimum {program['gpa_min']} GPA"
-
-            prompt = ELIGIBILITY_PROMPT.format(
-                profile=profile_text,
-                name=program.get('name', 'Unknown'),
-                provider=program.get('provider', 'Unknown'),
-                level=program.get('level', 'Unknown'),
-                funding_type=program.get('funding_type', 'Unknown'),
-                description=program.get('description') or 'No description available',
-                countries_eligible=', '.join(program.get('countries_eligible', [])) or 'Not specified',
-                countries_of_study=', '.join(program.get('countries_of_study', [])) or 'Not specified',
-                fields=', '.join(program.get('fields', [])) or 'All fields',
-                who_wins=program.get('who_wins') or 'Not specified',
-                age_requirements=age_req,
-                gpa_requirements=gpa_req,
-                eligibility_rules=rules_text,
-                target_degree_upper=target_degree_label.upper()
-            )
+    # Group programs so each Gemini call scores several of them at once
+    groups = [
+        programs[i:i + ELIGIBILITY_BATCH_SIZE]
+        for i in range(0, len(programs), ELIGIBILITY_BATCH_SIZE)
+    ]
+    logger.debug("Analyzing %d programs in %d groups of up to %d", len(programs), len(groups), ELIGIBILITY_BATCH_SIZE)
 
-            logger.debug(f"[{idx+1}] Sending to Gemini for analysis...")
-            response = gemini_client.models.generate_content(
-                model="gemini-2.5-pro",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    max_output_tokens=1024,
-                    temperature=0.3
-                )
-            )
+    if use_batch:
+        for group_matches in await _analyze_groups_batch_mode(groups, profile_prompt):
+            results.extend(group_matches)
+        logger.debug("ELIGIBILITY BATCH JOB COMPLETE: %d results", len(results))
+        return results
 
-            logger.debug(f"[{idx+1}] Gemini response received, parsing...")
-            result_text = response.text.strip()
-            if result_text.startswith("```"):
-                result_text = result_text.split("```")[1]
-                if result_text.startswith("json"):
-                    result_text = result_text[4:]
-            result_text = result_text.strip()
-
-            analysis = json.loads(result_text)
-            logger.debug(f"[{idx+1}] Analysis result: status={analysis.get('status')}, score={analysis.get('match_score')}")
-
-            results.append(ProgramMatch(
-                program_id=program['id'],
-                program_name=program.get('name', 'Unknown'),
-                provider=program.get('provider', 'Unknown'),
-                level=program.get('level', 'unknown'),
-                funding_type=program.get('funding_type', 'unknown'),
-                match_score=min(100, max(0, int(analysis.get('match_score', 50)))),
-                status=analysis.get('status', 'maybe'),
-                explanation=analysis.get('explanation', 'Unable to analyze this program.'),
-                strengths=analysis.get('strengths', []),
-                concerns=analysis.get('concerns', []),
-                action_items=analysis.get('action_items', [])
-            ))
+    group_results = await asyncio.gather(*[
+        _analyze_group(group_idx, group, profile_prompt)
+        for group_idx, group in enumerate(groups)
+    ], return_exceptions=True)
+    # Results come back in group order; a group that raised still yields one fallback per program
+    for group, group_matches in zip(groups, group_results):
+        if isinstance(group_matches, BaseException):
+            logger.error("Eligibility group failed: %s: %s", type(group_matches).__name__, group_matches)
+            group_matches = [_fallback_match(program) for program in group]
+        results.extend(group_matches)
 
-        except Exception as e:
-            logger.error(f"[{idx+1}] Error analyzing program {program.get('id')}: {type(e).__name__}: {e}")
-            results.append(ProgramMatch(
-                program_id=program['id'],
-                program_name=program.get('name', 'Unknown'),
-                provider=program.get('provider', 'Unknown'),
-                level=program.get('level', 'unknown'),
-                funding_type=program.get('funding_type', 'unknown'),
-                match_score=50,
-                status='maybe',
-                explanation='We couldn\'t fully analyze this program. Please review the details manually.',
-                strengths=[],
-                concerns=['Automated analysis unavailable'],
-                action_items=['Review program requirements directly on their website']
-            ))
-
-    logger.debug(f"ELIGIBILITY ANALYSIS COMPLETE: {len(results)} results")
-    logger.debug(f"Results breakdown: eligible={sum(1 for r in results if r.status=='eligible')}, likely={sum(1 for r in results if r.status=='likely_eligible')}, maybe={sum(1 for r in results if r.status=='maybe')}, not_eligible={sum(1 for r in results if r.status=='not_eligible')}")
+    if debug:
+        counts = Counter(r.status for r in results)
+        logger.debug("ELIGIBILITY ANALYSIS COMPLETE: %d results", len(results))
+        logger.debug(
+            "Results breakdown: eligible=%d, likely=%d, maybe=%d, not_eligible=%d",
+            counts['eligible'], counts['likely_eligible'], counts['maybe'], counts['not_eligible']
+        )
     return results
@@ -2,78 +2,277 @@
 Data extraction service using Gemini AI.
 Includes extraction from web content and data sanitization.
 """
+import asyncio
+import functools
 import logging
-import json
 import re
-from datetime import datetime
+import orjson
+from datetime import datetime, timezone
 from google.genai import types
+from pydantic import TypeAdapter
 
 from ..dependencies import gemini_client
+from ..models.schemas import ExtractedProgram, ExtractedPage
 from ..prompts import EXTRACTION_PROMPT
+from . import extraction_cache
+from .llm import generate_text
 
 logger = logging.getLogger(__name__)
 
 # Valid values for database constraints
-VALID_OPERATORS = {'=', '>=', '<=', '>', '<', 'in', 'not_in', 'exists', 'between'}
-VALID_RULE_TYPES = {'gpa', 'degree', 'nationality', 'age', 'work_experience', 'language', 'other'}
-VALID_REQ_TYPES = {'transcript', 'cv', 'essay', 'references', 'proposal', 'test', 'interview', 'other'}
-VALID_STAGES = {'application', 'interview', 'nomination', 'result'}
-VALID_CONFIDENCE = {'high', 'medium', 'inferred'}
-VALID_LEVELS = {'bachelor', 'masters', 'phd', 'postdoc'}
-VALID_FUNDING_TYPES = {'full', 'partial', 'tuition_only', 'stipend_only'}
-
-
-def extract_with_gemini(content: str) -> dict:
-    """Extract scholarship data from web content using Gemini AI."""
-    logger.debug("=" * 50)
-    logger.debug("STARTING GEMINI EXTRACTION")
-    logger.debug("=" * 50)
-    logger.debug(f"Content length for extraction: {len(content)} characters")
-    logger.debug(f"Content preview (first 200 chars): {content[:200]}...")
+VALID_OPERATORS = frozenset({'=', '>=', '<=', '>', '<', 'in', 'not_in', 'exists', 'between'})
+VALID_RULE_TYPES = frozenset({'gpa', 'degree', 'nationality', 'age', 'work_experience', 'language', 'other'})
+VALID_REQ_TYPES = frozenset({'transcript', 'cv', 'essay', 'references', 'proposal', 'test', 'interview', 'other'})
+VALID_STAGES = frozenset({'application', 'interview', 'nomination', 'result'})
+VALID_CONFIDENCE = frozenset({'high', 'medium', 'inferred'})
+VALID_LEVELS = frozenset({'bachelor', 'masters', 'phd', 'postdoc'})
+VALID_FUNDING_TYPES = frozenset({'full', 'partial', 'tuition_only', 'stipend_only'})
+
+# Free-text operators the LLM commonly emits
+_OPERATOR_MAPPING = {
+    'has': 'exists',
+    'contains': 'in',
+    'is': '=',
+    'equals': '=',
+    'greater': '>',
+    'less': '<',
+    'minimum': '>=',
+    'maximum': '<=',
+    'required': 'exists',
+    'must': 'exists',
+}
+
+# Free-text level names the LLM commonly emits
+LEVEL_ALIASES = {
+    'undergraduate': 'bachelor',
+    'bachelors': 'bachelor',
+    "bachelor's": 'bachelor',
+    'graduate': 'masters',
+    "master's": 'masters',
+    'master': 'masters',
+    'msc': 'masters',
+    'mba': 'masters',
+    'doctoral': 'phd',
+    'doctorate': 'phd',
+    'post-doctoral': 'postdoc',
+    'post-doc': 'postdoc',
+}
+
+# Numeric fragments pulled out of free text ("3.5 GPA", "up to 35 years")
+_INT_RE = re.compile(r'\d+')
+_FLOAT_RE = re.compile(r'\d+\.?\d*')
+
+# Static prompt prefix, built once; page content is sent as a separate part
+_PROMPT_HEADER = EXTRACTION_PROMPT + "\n\nWebpage content:\n"
+
+EXTRACTION_MODEL = "gemini-2.5-pro"
+
+# Structured output: the schema keeps the model to the fields we store, so the
+# output budget only needs to cover one program (2.5 Pro's thinking counts toward it)
+EXTRACTION_SCHEMA = ExtractedProgram.model_json_schema()
+EXTRACTION_BATCH_SCHEMA = TypeAdapter(list[ExtractedPage]).json_schema()
+EXTRACTION_THINKING_BUDGET = 2048
+EXTRACTION_MAX_OUTPUT_TOKENS = 4096 + EXTRACTION_THINKING_BUDGET
+
+
+async def extract_with_gemini(content: str) -> dict:
+    """Extract scholarship data from web content using Gemini AI (non-blocking)."""
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("=" * 50)
+        logger.debug("STARTING GEMINI EXTRACTION")
+        logger.debug("=" * 50)
+        logger.debug("Content length for extraction: %d characters", len(content))
+        logger.debug("Content preview (first 200 chars): %s...", content[:200])
+
+    # Identical page content + model + prompt version -> reuse the earlier result
+    cache_key = extraction_cache.make_key(EXTRACTION_MODEL, content)
+    cached = await extraction_cache.get(cache_key)
+    if cached is not None:
+        logger.debug("Extraction cache hit (%s) - skipping Gemini", cache_key[:12])
+        return cached
 
     if not gemini_client:
         logger.error("CRITICAL: Gemini client is None - not initialized")
         raise Exception("Gemini client not initialized")
 
     logger.debug("Gemini client is valid, preparing request...")
-    logger.debug(f"Using model: gemini-2.5-pro")
-    logger.debug(f"Max output tokens: 32768")
+    logger.debug("Using model: %s", EXTRACTION_MODEL)
+    logger.debug("Max output tokens: %d", EXTRACTION_MAX_OUTPUT_TOKENS)
 
     try:
-        response = gemini_client.models.generate_content(
-            model="gemini-2.5-pro",
-            contents=f"{EXTRACTION_PROMPT}\n\nWebpage content:\n{content}",
+        text = await generate_text(
+            model=EXTRACTION_MODEL,
+            contents=[_PROMPT_HEADER, types.Part.from_text(text=content)],
             config=types.GenerateContentConfig(
                 response_mime_type="application/json",
-                max_output_tokens=32768  # 32k tokens to prevent cutoff
+                response_json_schema=EXTRACTION_SCHEMA,
+                max_output_tokens=EXTRACTION_MAX_OUTPUT_TOKENS,
+                thinking_config=types.ThinkingConfig(thinking_budget=EXTRACTION_THINKING_BUDGET)
             )
         )
         logger.debug("Gemini API call successful")
     except Exception as e:
-        logger.error(f"Gemini API call failed: {type(e).__name__}: {e}")
+        logger.error("Gemini API call failed: %s: %s", type(e).__name__, e)
         raise
 
-    logger.debug(f"Gemini response received, text length: {len(response.text)}")
-    logger.debug(f"Response preview (first 500 chars): {response.text[:500]}...")
-    
+    if debug:
+        logger.debug("Gemini response received, text length: %d", len(text))
+        logger.debug("Response preview (first 500 chars): %s...", text[:500])
+
     try:
-        result = json.loads(response.text)
-        logger.debug(f"JSON parsed successfully")
-        logger.debug(f"Extracted keys: {list(result.keys())}")
-        logger.debug(f"Program name: {result.get('name', 'N/A')}")
-        logger.debug(f"Confidence score: {result.get('confidence_score', 'N/A')}")
-        logger.debug(f"Eligibility rules count: {len(result.get('eligibility_rules', []))}")
-        logger.debug(f"Requirements count: {len(result.get('requirements', []))}")
-        logger.debug(f"Deadlines count: {len(result.get('deadlines', []))}")
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON parsing failed: {e}")
-        logger.error(f"Raw response was: {response.text[:1000]}")
+        result = orjson.loads(text)
+        # The model occasionally wraps the object in a single-element array
+        if isinstance(result, list) and result and isinstance(result[0], dict):
+            logger.warning("Extraction returned a JSON array - using first object")
+            result = result[0]
+        if not isinstance(result, dict):
+            raise ValueError(f"Expected a JSON object from extraction, got {type(result).__name__}")
+        if debug:
+            logger.debug("JSON parsed successfully")
+            logger.debug("Extracted keys: %s", list(result.keys()))
+            logger.debug("Program name: %s", result.get('name', 'N/A'))
+            logger.debug("Confidence score: %s", result.get('confidence_score', 'N/A'))
+            logger.debug("Eligibility rules count: %d", len(result.get('eligibility_rules', [])))
+            logger.debug("Requirements count: %d", len(result.get('requirements', [])))
+            logger.debug("Deadlines count: %d", len(result.get('deadlines', [])))
+    except orjson.JSONDecodeError as e:
+        logger.error("JSON parsing failed: %s", e)
+        logger.error("Raw response was: %s", text[:1000])
         raise
     
+    await extraction_cache.put(cache_key, EXTRACTION_MODEL, result)
+
     logger.debug("EXTRACTION COMPLETE")
     return result
 
 
+# ============================================================================
+# MULTI-PAGE EXTRACTION
+# ============================================================================
+
+# Pages sent together in one generate_content call (batch ingest)
+EXTRACTION_BATCH_SIZE = 5
+# Combined page characters per call - keeps the grouped prompt well inside the context window
+EXTRACTION_BATCH_MAX_CHARS = 300_000
+
+_BATCH_INSTRUCTIONS = """
+
+MULTIPLE PAGES:
+You will receive {count} webpages. Each one starts with a line "=== PAGE <n>: <url> ===".
+Extract each page independently - never mix information between pages.
+Return ONLY a JSON array of exactly {count} objects, one per page, in page order.
+Each object uses the structure above plus two extra keys: "page": <n> and "url": "<page url>".
+"""
+
+
+def chunk_pages(pages: list[tuple[str, str]]) -> list[list[tuple[str, str]]]:
+    """Group (url, content) pairs into chunks bounded by page count and total characters."""
+    chunks: list[list[tuple[str, str]]] = []
+    current: list[tuple[str, str]] = []
+    current_chars = 0
+    for url, content in pages:
+        if current and (
+            len(current) >= EXTRACTION_BATCH_SIZE
+            or current_chars + len(content) > EXTRACTION_BATCH_MAX_CHARS
+        ):
+            chunks.append(current)
+            current, current_chars = [], 0
+        current.append((url, content))
+        current_chars += len(content)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def extract_with_gemini_batch(pages: list[tuple[str, str]]) -> list[dict | Exception]:
+    """Extract several (url, content) pages with a single Gemini call.
+
+    Returns one entry per page, in order: the extracted dict, or the Exception
+    that page failed with. Cached pages are not re-sent, and pages the grouped
+    response does not cover fall back to extract_with_gemini.
+    """
+    results: list[dict | Exception | None] = [None] * len(pages)
+
+    keys = [extraction_cache.make_key(EXTRACTION_MODEL, content) for _, content in pages]
+    cached = await asyncio.gather(*(extraction_cache.get(key) for key in keys))
+    pending: list[int] = []
+    for i, hit in enumerate(cached):
+        if hit is not None:
+            results[i] = hit
+        else:
+            pending.append(i)
+
+    logger.debug("Batch extraction: %d pages, %d cached", len(pages), len(pages) - len(pending))
+
+    # Nothing to group - the single-page path already handles caching
+    if len(pending) == 1:
+        i = pending[0]
+        try:
+            results[i] = await extract_with_gemini(pages[i][1])
+        except Exception as e:
+            results[i] = e
+        return results
+
+    if pending:
+        if not gemini_client:
+            raise Exception("Gemini client not initialized")
+
+        contents: list = [EXTRACTION_PROMPT + _BATCH_INSTRUCTIONS.format(count=len(pending))]
+        for n, i in enumerate(pending, start=1):
+            url, content = pages[i]
+            contents.append(types.Part.from_text(text=f"\n=== PAGE {n}: {url} ===\n{content}"))
+
+        by_page: dict[int, dict] = {}
+        try:
+            text = await generate_text(
+                model=EXTRACTION_MODEL,
+                contents=contents,
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json",
+                    response_json_schema=EXTRACTION_BATCH_SCHEMA,
+                    max_output_tokens=min(65536, 4096 * len(pending) + EXTRACTION_THINKING_BUDGET),
+                    thinking_config=types.ThinkingConfig(thinking_budget=EXTRACTION_THINKING_BUDGET)
+                )
+            )
+            parsed = orjson.loads(text)
+            if not isinstance(parsed, list):
+                raise ValueError(f"Expected a JSON array from batch extraction, got {type(parsed).__name__}")
+
+            url_to_page = {pages[i][0]: n for n, i in enumerate(pending, start=1)}
+            for position, item in enumerate(parsed, start=1):
+                if not isinstance(item, dict):
+                    continue
+                n = item.pop("page", None)
+                url = item.pop("url", None)
+                if not isinstance(n, int) or not 1 <= n <= len(pending):
+                    n = url_to_page.get(url, position)
+                if 1 <= n <= len(pending):
+                    by_page.setdefault(n, item)
+        except Exception as e:
+            logger.warning("Batch extraction of %d pages failed (%s: %s) - falling back to single calls", len(pending), type(e).__name__, e)
+
+        missing: list[int] = []
+        for n, i in enumerate(pending, start=1):
+            item = by_page.get(n)
+            if item is None:
+                missing.append(i)
+                continue
+            results[i] = item
+            await extraction_cache.put(keys[i], EXTRACTION_MODEL, item)
+
+        if missing:
+            logger.warning("Batch extraction missing %d/%d pages - extracting individually", len(missing), len(pending))
+            singles = await asyncio.gather(
+                *(extract_with_gemini(pages[i][1]) for i in missing),
+                return_exceptions=True
+            )
+            for i, outcome in zip(missing, singles):
+                results[i] = outcome
+
+    return results
+
+
 # ============================================================================
 # SANITIZATION FUNCTIONS
 # ============================================================================
@@ -87,98 +286,84 @@ def sanitize_level(level) -> str:
         return 'masters'
 
     if isinstance(level, str):
-        level_lower = level.lower().strip()
-        if level_lower in VALID_LEVELS:
-            return level_lower
-
-        mapping = {
-            'undergraduate': 'bachelor',
-            'bachelors': 'bachelor',
-            "bachelor's": 'bachelor',
-            'graduate': 'masters',
-            "master's": 'masters',
-            'master': 'masters',
-            'msc': 'masters',
-            'mba': 'masters',
-            'doctoral': 'phd',
-            'doctorate': 'phd',
-            'post-doctoral': 'postdoc',
-            'post-doc': 'postdoc',
-        }
-        return mapping.get(level_lower, 'masters')
+        return _normalize_level(level)
 
     return 'masters'
 
 
+@functools.lru_cache(maxsize=128)
+def _normalize_level(level: str) -> str:
+    """Map a free-text level string to a valid level (cached - small vocabulary)."""
+    level_lower = level.lower().strip()
+    if level_lower in VALID_LEVELS:
+        return level_lower
+    return LEVEL_ALIASES.get(level_lower, 'masters')
+
+
 def sanitize_funding_type(funding_type) -> str:
     """Ensure funding_type is a valid value."""
     if isinstance(funding_type, str):
-        ft_lower = funding_type.lower().strip()
-        if ft_lower in VALID_FUNDING_TYPES:
-            return ft_lower
-        if 'full' in ft_lower:
-            return 'full'
-        if 'tuition' in ft_lower:
-            return 'tuition_only'
-        if 'stipend' in ft_lower:
-            return 'stipend_only'
+        return _normalize_funding_type(funding_type)
+    return 'partial'
+
+
+@functools.lru_cache(maxsize=128)
+def _normalize_funding_type(funding_type: str) -> str:
+    """Map a free-text funding type to a valid value (cached - small vocabulary)."""
+    ft_lower = funding_type.lower().strip()
+    if ft_lower in VALID_FUNDING_TYPES:
+        return ft_lower
+    if 'full' in ft_lower:
+        return 'full'
+    if 'tuition' in ft_lower:
+        return 'tuition_only'
+    if 'stipend' in ft_lower:
+        return 'stipend_only'
     return 'partial'
 
 
 def sanitize_int(value) -> int | None:
     """Safely convert value to integer."""
-    if value is None:
+    if value is None or isinstance(value, bool):
         return None
     try:
         if isinstance(value, (int, float)):
             return int(value)
         if isinstance(value, str):
-            match = re.search(r'\d+', value)
+            match = _INT_RE.search(value)
             if match:
                 return int(match.group())
         return None
-    except:
+    except (ValueError, TypeError, OverflowError):
         return None
 
 
 def sanitize_float(value) -> float | None:
     """Safely convert value to float."""
-    if value is None:
+    if value is None or isinstance(value, bool):
         return None
     try:
         if isinstance(value, (int, float)):
             return round(float(value), 2)
         if isinstance(value, str):
-            match = re.search(r'\d+\.?\d*', value)
+            match = _FLOAT_RE.search(value)
             if match:
                 return round(float(match.group()), 2)
         return None
-    except:
+    except (ValueError, TypeError, OverflowError):
         return None
 
 
 def sanitize_eligibility_rule(rule: dict) -> dict | None:
-    """Sanitize eligibility rule to match database constraints."""
+    """Sanitize eligibility rule into an insertable row (program_id is added by the caller)."""
     try:
         rule_type = rule.get('rule_type', 'other')
         operator = rule.get('operator', 'exists')
         confidence = rule.get('confidence', 'medium')
 
-        operator_mapping = {
-            'has': 'exists',
-            'contains': 'in',
-            'is': '=',
-            'equals': '=',
-            'greater': '>',
-            'less': '<',
-            'minimum': '>=',
-            'maximum': '<=',
-            'required': 'exists',
-            'must': 'exists',
-        }
-
         if operator not in VALID_OPERATORS:
-            operator = operator_mapping.get(operator.lower(), 'exists')
+            operator_lc = operator.lower() if isinstance(operator, str) else ''
+            operator = _OPERATOR_MAPPING.get(operator_lc, 'exists')
 
         if rule_type not in VALID_RULE_TYPES:
             rule_type = 'other'
@@ -194,12 +379,12 @@ def sanitize_eligibility_rule(rule: dict) -> dict | None:
             'source_snippet': rule.get('source_snippet')
         }
     except Exception as e:
-        logger.warning(f"Failed to sanitize eligibility rule: {e}")
+        logger.warning("Failed to sanitize eligibility rule: %s", e)
         return None
 
 
 def sanitize_requirement(req: dict) -> dict | None:
-    """Sanitize requirement to match database constraints."""
+    """Sanitize requirement into an insertable row (program_id is added by the caller)."""
     try:
         req_type = req.get('type', 'other')
         if req_type not in VALID_REQ_TYPES:
@@ -211,13 +396,16 @@ def sanitize_requirement(req: dict) -> dict | None:
             'mandatory': req.get('mandatory', True)
         }
     except Exception as e:
-        logger.warning(f"Failed to sanitize requirement: {e}")
+        logger.warning("Failed to sanitize requirement: %s", e)
         return None
 
 
 def sanitize_deadline(deadline: dict) -> dict | None:
-    """Sanitize deadline to match database constraints."""
+    """Sanitize deadline to match database constraints (None when it has no date)."""
     try:
+        if not deadline.get('deadline_date'):
+            return None
+
         stage = deadline.get('stage', 'application')
         if stage not in VALID_STAGES:
             stage = 'application'
@@ -228,12 +416,17 @@ def sanitize_deadline(deadline: dict) -> dict | None:
             'stage': stage
         }
     except Exception as e:
-        logger.warning(f"Failed to sanitize deadline: {e}")
+        logger.warning("Failed to sanitize deadline: %s", e)
         return None
 
 
-def sanitize_program_data(extracted: dict, url: str) -> dict:
-    """Build sanitized program data from extraction result."""
+def utc_now_iso() -> str:
+    """Current UTC time as an ISO-8601 string with offset (for timestamptz columns)."""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def sanitize_program_data(extracted: dict, url: str, verified_at: str | None = None) -> dict:
+    """Build sanitized program data from extraction result (verified_at defaults to now)."""
     return {
         "name": extracted.get("name") or "Unknown Program",
         "provider": extracted.get("provider") or "Unknown",
@@ -247,7 +440,7 @@ def sanitize_program_data(extracted: dict, url: str) -> dict:
         "who_wins": extracted.get("who_wins"),
         "rejection_reasons": extracted.get("rejection_reasons"),
         "status": "active",
-        "last_verified_at": datetime.utcnow().isoformat(),
+        "last_verified_at": verified_at or utc_now_iso(),
         "application_url": extracted.get("application_url"),
         "benefits": extracted.get("benefits") or {},
         "contact_email": extracted.get("contact_email"),
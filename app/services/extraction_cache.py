@@ -0,0 +1,151 @@
+"""
+Content-addressed cache for Gemini extraction results.
+
+Keyed on BLAKE2b of (model, prompt version, page content), so re-ingesting an
+unchanged page skips the LLM call and any prompt edit invalidates old entries.
+Backed by the Supabase `extraction_cache` table (migrations/007), with a small
+in-process LRU in front of it; entries expire after CACHE_TTL_DAYS.
+"""
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from postgrest.types import ReturnMethod
+
+from ..dependencies import get_supabase_async, get_pg_pool, db_slot
+from ..prompts import EXTRACTION_PROMPT
+
+logger = logging.getLogger(__name__)
+
+# Changes whenever the extraction prompt is edited
+PROMPT_VERSION = hashlib.sha256(EXTRACTION_PROMPT.encode()).hexdigest()[:16]
+
+# Entries older than this are ignored (and overwritten on the next extraction)
+CACHE_TTL_DAYS = 7
+
+# In-process front tier: key -> (expires_at monotonic, payload)
+_MEMORY_CACHE: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+_MEMORY_CACHE_SIZE = 256
+
+# Keys a cached payload must carry to be reused (see sanitize_* in extraction.py)
+_LIST_KEYS = ("eligibility_rules", "requirements", "deadlines")
+
+
+def make_key(model: str, content: str) -> str:
+    """Cache key for one page's extraction."""
+    # BLAKE2b is faster than SHA-256 and 128 bits is plenty for a cache key
+    h = hashlib.blake2b(digest_size=16)
+    h.update(model.encode())
+    h.update(b"\x00")
+    h.update(PROMPT_VERSION.encode())
+    h.update(b"\x00")
+    h.update(content.encode())
+    return h.hexdigest()
+
+
+def _is_valid(payload) -> bool:
+    """Shape check for a cached extraction; anything else is evicted."""
+    if not isinstance(payload, dict) or not isinstance(payload.get("name"), str):
+        return False
+    return all(isinstance(payload.get(k, []), list) for k in _LIST_KEYS)
+
+
+def _memory_get(key: str) -> dict | None:
+    entry = _MEMORY_CACHE.get(key)
+    if entry is None:
+        return None
+    expires_at, payload = entry
+    if expires_at < time.monotonic():
+        del _MEMORY_CACHE[key]
+        return None
+    _MEMORY_CACHE.move_to_end(key)
+    return payload
+
+
+def _memory_put(key: str, payload: dict):
+    _MEMORY_CACHE[key] = (time.monotonic() + CACHE_TTL_DAYS * 86400, payload)
+    _MEMORY_CACHE.move_to_end(key)
+    while len(_MEMORY_CACHE) > _MEMORY_CACHE_SIZE:
+        _MEMORY_CACHE.popitem(last=False)
+
+
+async def get(key: str) -> dict | None:
+    """Return the cached extraction for key, or None. Never raises."""
+    payload = _memory_get(key)
+    if payload is not None:
+        return payload
+
+    try:
+        pool = await get_pg_pool()
+        if pool:
+            async with db_slot():
+                payload = await pool.fetchval(
+                    "SELECT payload FROM public.extraction_cache "
+                    "WHERE key = $1 AND created_at > now() - make_interval(days => $2)",
+                    key, CACHE_TTL_DAYS,
+                )
+        else:
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=CACHE_TTL_DAYS)).isoformat()
+            supabase = await get_supabase_async()
+            async with db_slot():
+                result = await supabase.table("extraction_cache").select("payload").eq(
+                    "key", key
+                ).gte("created_at", cutoff).limit(1).execute()
+            payload = result.data[0]["payload"] if result.data else None
+    except Exception as e:
+        logger.warning("Extraction cache read failed: %s", e)
+        return None
+
+    if payload is None:
+        return None
+    if not _is_valid(payload):
+        logger.warning("Evicting malformed extraction cache entry %s", key[:12])
+        await delete(key)
+        return None
+    _memory_put(key, payload)
+    return payload
+
+
+async def put(key: str, model: str, payload: dict):
+    """Store an extraction result. Failures are logged, never raised."""
+    _memory_put(key, payload)
+    try:
+        pool = await get_pg_pool()
+        if pool:
+            async with db_slot():
+                await pool.execute(
+                    "INSERT INTO public.extraction_cache (key, model, prompt_version, payload) "
+                    "VALUES ($1, $2, $3, $4) "
+                    "ON CONFLICT (key) DO UPDATE SET payload = EXCLUDED.payload, created_at = now()",
+                    key, model, PROMPT_VERSION, payload,
+                )
+        else:
+            supabase = await get_supabase_async()
+            async with db_slot():
+                await supabase.table("extraction_cache").upsert({
+                    "key": key,
+                    "model": model,
+                    "prompt_version": PROMPT_VERSION,
+                    "payload": payload,
+                    # Upserts keep the old row's columns; refresh the TTL clock explicitly
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                }, returning=ReturnMethod.minimal).execute()
+    except Exception as e:
+        logger.warning("Extraction cache write failed: %s", e)
+
+
+async def delete(key: str):
+    """Drop one cache entry. Failures are logged, never raised."""
+    _MEMORY_CACHE.pop(key, None)
+    try:
+        pool = await get_pg_pool()
+        if pool:
+            async with db_slot():
+                await pool.execute("DELETE FROM public.extraction_cache WHERE key = $1", key)
+        else:
+            supabase = await get_supabase_async()
+            async with db_slot():
+                await supabase.table("extraction_cache").delete().eq("key", key).execute()
+    except Exception as e:
+        logger.warning("Extraction cache delete failed: %s", e)
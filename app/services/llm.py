@@ -0,0 +1,24 @@
+"""
+Thin helpers over the async Gemini client shared by the AI services.
+"""
+from google.genai import types
+
+from ..dependencies import gemini_client
+
+
+async def generate_text(model: str, contents, config: types.GenerateContentConfig) -> str:
+    """
+    Run generate_content as a stream and return the concatenated text.
+
+    Chunks are collected while the rest of the response is still arriving, so
+    only the final join and parse remain once the stream closes.
+    """
+    parts: list[str] = []
+    stream = await gemini_client.aio.models.generate_content_stream(
+        model=model, contents=contents, config=config
+    )
+    async for chunk in stream:
+        text = chunk.text
+        if text:
+            parts.append(text)
+    return "".join(parts)
@@ -0,0 +1,81 @@
+"""
+Active program catalogue used by the eligibility checker.
+
+Programs only change when the agent ingests, so the fetch is cached in-process
+for a short TTL and dropped explicitly after every successful write.
+"""
+import logging
+import time
+
+from ..config import PROGRAMS_CACHE_TTL
+from ..dependencies import get_supabase_async, get_pg_pool, db_slot
+
+logger = logging.getLogger(__name__)
+
+# Same shape as the PostgREST select below (programs + embedded eligibility_rules)
+ACTIVE_PROGRAMS_SQL = """
+SELECT p.id::text AS id, p.name, p.provider, p.level, p.funding_type, p.description,
+       p.countries_eligible, p.countries_of_study, p.fields, p.who_wins,
+       p.age_min, p.age_max, p.gpa_min::float8 AS gpa_min,
+       COALESCE(
+         (SELECT jsonb_agg(to_jsonb(r)) FROM public.eligibility_rules r WHERE r.program_id = p.id),
+         '[]'::jsonb
+       ) AS eligibility_rules
+FROM public.programs p
+WHERE p.status = 'active'
+  AND ($1::text IS NULL OR p.level = $1)
+"""
+
+# Values programs.level can hold (migrations/001 check constraint)
+VALID_LEVELS = frozenset({'bachelor', 'masters', 'phd', 'postdoc'})
+
+# (cache version, level or None) -> (expires_at, programs)
+_PROGRAMS_CACHE: dict[tuple[str, str | None], tuple[float, list[dict]]] = {}
+_CACHE_VERSION = "programs_v1"
+
+
+def invalidate_programs_cache() -> None:
+    """Drop the cached catalogue; called after ingest writes."""
+    _PROGRAMS_CACHE.clear()
+
+
+async def _load_active_programs(level: str | None) -> list[dict]:
+    pool = await get_pg_pool()
+    if pool:
+        async with db_slot():
+            rows = await pool.fetch(ACTIVE_PROGRAMS_SQL, level)
+        return [dict(row) for row in rows]
+
+    supabase = await get_supabase_async()
+    query = supabase.table("programs").select(
+        "id, name, provider, level, funding_type, description, "
+        "countries_eligible, countries_of_study, fields, who_wins, "
+        "age_min, age_max, gpa_min, eligibility_rules(*)"
+    ).eq("status", "active")
+    if level:
+        query = query.eq("level", level)
+    async with db_slot():
+        result = await query.execute()
+    return result.data or []
+
+
+async def fetch_active_programs(target_degree: str | None = None) -> list[dict]:
+    """Fetch active programs with their eligibility rules (cached).
+
+    A recognised target_degree is pushed into the query: a program at another
+    level is a hard disqualifier, so there is no point sending it to the LLM.
+    """
+    level = target_degree.lower().strip() if target_degree else None
+    if level not in VALID_LEVELS:
+        level = None
+
+    key = (_CACHE_VERSION, level)
+    cached = _PROGRAMS_CACHE.get(key)
+    if cached and cached[0] > time.monotonic():
+        logger.debug("Active programs cache hit (%d programs, level=%s)", len(cached[1]), level)
+        return cached[1]
+
+    programs = await _load_active_programs(level)
+    if PROGRAMS_CACHE_TTL > 0:
+        _PROGRAMS_CACHE[key] = (time.monotonic() + PROGRAMS_CACHE_TTL, programs)
+    return programs
@@ -11,13 +11,23 @@ Layers:
 """
 import logging
 import random
+import re
 import asyncio
-from bs4 import BeautifulSoup
+import importlib.util
+import ipaddress
+import socket
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+from lxml import etree, html as lxml_html
 import httpx
-from curl_cffi import requests as curl_requests
+from curl_cffi.requests import AsyncSession
 from fake_useragent import UserAgent
 import cloudscraper
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, Browser, TimeoutError as PlaywrightTimeoutError
+
+from ..config import SCRAPER_CONCURRENCY, SCRAPER_THREADS, PW_MAX_CONTEXTS
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +48,9 @@ FALLBACK_USER_AGENTS = [
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
 ]
 
+# Only advertise brotli when we can decode it (httpx/requests need the brotli package)
+ACCEPT_ENCODING = "gzip, deflate" + (", br" if importlib.util.find_spec("brotli") else "")
+
 VIEWPORTS = [
     {"width": 1920, "height": 1080},
     {"width": 1366, "height": 768},
@@ -47,12 +60,324 @@ VIEWPORTS = [
     {"width": 2560, "height": 1440},
 ]
 
+# Status codes that indicate blocking / upstream protection
+BLOCKED_STATUS_CODES = {403, 429, 503, 520, 521, 522, 523, 524}
+# Only these are worth a backoff before retrying
+RATE_LIMIT_STATUS_CODES = {429, 503}
+# The page is gone or needs credentials: no heavier layer can get past these
+TERMINAL_STATUS_CODES = {401, 404, 410}
+
+
+# Redirects are followed by hand so every hop goes through the SSRF guard
+REDIRECT_STATUS_CODES = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 10
+
+
+class FetchAbortedError(Exception):
+    """A layer hit something no other layer can get past; stop the whole chain."""
+
+
+class BlockedURLError(FetchAbortedError):
+    """The URL, a redirect target or the server actually connected to is not public."""
+
+
+class TerminalStatusError(FetchAbortedError):
+    """A layer got a status that makes every remaining layer pointless."""
+
+    def __init__(self, url: str, status: int):
+        super().__init__(f"Failed to fetch content from {url} - HTTP {status}")
+        self.status = status
+
 # Chrome impersonation versions for curl_cffi
 CHROME_VERSIONS = [
     "chrome110", "chrome116", "chrome119", "chrome120",
     "chrome123", "chrome124", "chrome131",
 ]
 
+# Cap open browser contexts across all Playwright layers (they share the pooled browsers)
+_PLAYWRIGHT_SEM = asyncio.Semaphore(PW_MAX_CONTEXTS)
+
+# Cap whole-page fetches in flight, so fan-out can't pile up browser contexts
+_SCRAPE_SEM = asyncio.Semaphore(SCRAPER_CONCURRENCY)
+
+# Dedicated threads for blocking clients (Cloudscraper), kept off the default executor
+_SCRAPE_POOL = ThreadPoolExecutor(max_workers=SCRAPER_THREADS, thread_name_prefix="scrape")
+
+# Chromium launch flags per Playwright layer (Playwright requires a list)
+_CHROMIUM_ARGS_BASIC = (
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-infobars',
+    '--disable-extensions',
+    '--disable-gpu',
+    '--disable-software-rasterizer',
+    '--window-position=0,0',
+    '--ignore-certificate-errors',
+    '--ignore-certificate-errors-spki-list',
+    '--disable-features=IsolateOrigins,site-per-process',
+)
+
+# Never decode images or download web fonts in the heavier layers (route blocking
+# only stops the network fetch; Blink would still allocate for inline/data: images)
+_NO_IMAGES_ARGS = (
+    '--blink-settings=imagesEnabled=false',
+    '--disable-remote-fonts',
+)
+
+_CHROMIUM_ARGS_HUMAN = (
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-infobars',
+    '--disable-extensions',
+    '--window-position=0,0',
+    '--ignore-certificate-errors',
+    '--disable-features=IsolateOrigins,site-per-process',
+    '--disable-web-security',
+    '--disable-features=BlockInsecurePrivateNetworkRequests',
+    *_NO_IMAGES_ARGS,
+)
+
+_CHROMIUM_ARGS_CHALLENGE = (
+    '--disable-blink-features=AutomationControlled',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-accelerated-2d-canvas',
+    '--no-first-run',
+    '--renderer-process-limit=4',
+    '--disable-gpu',
+    *_NO_IMAGES_ARGS,
+    '--ignore-certificate-errors',
+    '--disable-features=IsolateOrigins,site-per-process',
+)
+
+# Stealth init scripts, built once and shared by the Playwright layers
+_STEALTH_JS_COMMON = """
+Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']});
+"""
+
+_STEALTH_JS_NO_AUTOMATION_GLOBALS = """
+delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
+delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
+delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
+"""
+
+_STEALTH_JS_BASIC = _STEALTH_JS_COMMON + """
+Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
+window.chrome = {runtime: {}};
+"""
+
+_STEALTH_JS_HUMAN = _STEALTH_JS_COMMON + _STEALTH_JS_NO_AUTOMATION_GLOBALS + """
+Object.defineProperty(navigator, 'plugins', {
+    get: () => {
+        const plugins = [
+            {name: 'Chrome PDF Plugin', filename: 'internal-pdf-viewer'},
+            {name: 'Chrome PDF Viewer', filename: 'mhjfbmdgcfjbbpaeojofohoefgiehjai'},
+            {name: 'Native Client', filename: 'internal-nacl-plugin'},
+        ];
+        plugins.length = 3;
+        return plugins;
+    }
+});
+window.chrome = {runtime: {}, loadTimes: function() {}, csi: function() {}, app: {}};
+const originalQuery = window.navigator.permissions.query;
+window.navigator.permissions.query = (parameters) => (
+    parameters.name === 'notifications' ?
+        Promise.resolve({state: Notification.permission}) :
+        originalQuery(parameters)
+);
+const getParameter = WebGLRenderingContext.prototype.getParameter;
+WebGLRenderingContext.prototype.getParameter = function(parameter) {
+    if (parameter === 37445) return 'Intel Inc.';
+    if (parameter === 37446) return 'Intel Iris OpenGL Engine';
+    return getParameter.apply(this, arguments);
+};
+"""
+
+_STEALTH_JS_CHALLENGE = _STEALTH_JS_COMMON + _STEALTH_JS_NO_AUTOMATION_GLOBALS + """
+Object.defineProperty(navigator, 'plugins', {get: () => [1,2,3,4,5]});
+window.chrome = {runtime: {}, loadTimes: () => {}, csi: () => {}};
+delete window.__nightmare;
+delete window._phantom;
+delete window.callPhantom;
+"""
+
+# Upper bound on raw HTML kept per fetch; extraction only needs the head of the page
+_MAX_HTML_BYTES = 200_000
+
+# Block/challenge page markers, each compiled into one case-insensitive alternation
+# so a page is scanned once without lowercasing a copy of it
+def _any_of(*indicators: str) -> re.Pattern:
+    return re.compile("|".join(map(re.escape, indicators)), re.IGNORECASE)
+
+
+_BLOCKED_RE = _any_of('blocked')
+_BLOCK_PAGE_RE = _any_of('blocked', 'captcha', 'challenge', 'attention required', 'access denied')
+_CHALLENGE_RE = _any_of(
+    'challenge-running', 'cf-browser-verification',
+    'please wait', 'checking your browser', 'ddos-guard',
+    'just a moment', 'verify you are human',
+)
+
+# Playwright layers return document.body.innerText instead of serialized HTML
+# (unless the caller asked for raw HTML)
+PLAYWRIGHT_TEXT_ONLY = True
+# Smallest page the Playwright layers accept; rendered text is much shorter than its HTML
+MIN_HTML_CHARS = 500
+MIN_TEXT_CHARS = 200
+
+# Resource types that never contribute to page text
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+# Challenge pages (e.g. Cloudflare) can depend on CSS, so that layer keeps stylesheets
+CHALLENGE_BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+# Master switch for request blocking in the Playwright layers
+BLOCK_RESOURCES = True
+
+# Mouse jitter + smooth scrolling in Layer 5 (adds seconds per page; WAFs mostly
+# fingerprint TLS and headers instead)
+AGGRESSIVE_STEALTH = False
+
+# Shared curl_cffi session (created lazily on the running loop)
+_CURL_SESSION: AsyncSession | None = None
+_HTTPX_CLIENT: httpx.AsyncClient | None = None
+
+# Shared Playwright driver and one long-lived Chromium per layer (each has its own
+# launch flags); every fetch gets a fresh context for isolation
+_PLAYWRIGHT = None
+_BROWSERS: dict[str, Browser] = {}
+_BROWSER_LOCK = asyncio.Lock()
+_BROWSER_ARGS = {
+    "basic": _CHROMIUM_ARGS_BASIC,
+    "human": _CHROMIUM_ARGS_HUMAN,
+    "challenge": _CHROMIUM_ARGS_CHALLENGE,
+}
+
+
+# One browser identity per host for the Playwright layers: sites fingerprint per session,
+# and clearance cookies are only honoured for the user agent that earned them
+_HOST_FINGERPRINTS: OrderedDict[str, tuple[dict, str]] = OrderedDict()
+_HOST_FINGERPRINTS_SIZE = 1024
+
+# Layer 6 clearance per host (e.g. Cloudflare's cf_clearance cookie):
+# host -> (expires_at, storage state), LRU-bounded since hosts come from user input
+_CHALLENGE_STATE: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+_CHALLENGE_STATE_SIZE = 64
+CHALLENGE_STATE_TTL = 1800  # seconds; clearance cookies rarely outlive this
+
+# Conditional-GET validators for layers 1-2: url -> (ETag, Last-Modified, fetched HTML).
+# Kept in memory (the host disk is ephemeral); a 304 reuses the stored HTML
+_VALIDATORS: OrderedDict[str, tuple[str | None, str | None, str]] = OrderedDict()
+_VALIDATORS_SIZE = 128
+
+
+def _conditional_headers(url: str) -> dict:
+    """If-None-Match / If-Modified-Since for a URL fetched before, else nothing."""
+    entry = _VALIDATORS.get(url)
+    if entry is None:
+        return {}
+    etag, last_modified, _ = entry
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def _remember_validators(url: str, response, content: str):
+    """Store a successful response's validators (if any) alongside its HTML."""
+    etag = response.headers.get("etag")
+    last_modified = response.headers.get("last-modified")
+    if not (etag or last_modified):
+        _VALIDATORS.pop(url, None)
+        return
+    _VALIDATORS[url] = (etag, last_modified, content)
+    _VALIDATORS.move_to_end(url)
+    while len(_VALIDATORS) > _VALIDATORS_SIZE:
+        _VALIDATORS.popitem(last=False)
+
+
+def _not_modified_content(url: str) -> str | None:
+    """HTML stored for a URL the server just answered 304 for."""
+    entry = _VALIDATORS.get(url)
+    if entry is None:
+        return None
+    _VALIDATORS.move_to_end(url)
+    return entry[2]
+
+
+def get_curl_session() -> AsyncSession:
+    """Return the shared curl_cffi async session, creating it on first use."""
+    global _CURL_SESSION
+    if _CURL_SESSION is None:
+        _CURL_SESSION = AsyncSession(timeout=25, impersonate="chrome131")
+    return _CURL_SESSION
+
+
+def get_httpx_client() -> httpx.AsyncClient:
+    """Return the shared httpx client (HTTP/2, pooled), creating it on first use."""
+    global _HTTPX_CLIENT
+    if _HTTPX_CLIENT is None:
+        # One pool for every fetch: repeat hosts in a batch reuse (and multiplex on) one connection
+        _HTTPX_CLIENT = httpx.AsyncClient(
+            # Fail fast on dead hosts; the race falls through to the other layers
+            timeout=httpx.Timeout(20.0, connect=5.0),
+            # Redirects go through _follow_redirects so each hop is vetted
+            follow_redirects=False,
+            http2=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+        )
+    return _HTTPX_CLIENT
+
+
+async def close_scraper_sessions():
+    """Close shared HTTP sessions and browsers. Called on application shutdown."""
+    global _CURL_SESSION, _HTTPX_CLIENT
+    if _CURL_SESSION is not None:
+        await _CURL_SESSION.close()
+        _CURL_SESSION = None
+    if _HTTPX_CLIENT is not None:
+        await _HTTPX_CLIENT.aclose()
+        _HTTPX_CLIENT = None
+    await close_browsers()
+
+
+async def _get_browser(kind: str) -> Browser:
+    """Return the shared Chromium for a Playwright layer, (re)launching it if needed."""
+    global _PLAYWRIGHT
+    browser = _BROWSERS.get(kind)
+    if browser is not None and browser.is_connected():
+        return browser
+    async with _BROWSER_LOCK:
+        browser = _BROWSERS.get(kind)
+        if browser is None or not browser.is_connected():
+            if _PLAYWRIGHT is None:
+                _PLAYWRIGHT = await async_playwright().start()
+            logger.info("Launching shared Chromium (%s)", kind)
+            browser = await _PLAYWRIGHT.chromium.launch(headless=True, args=list(_BROWSER_ARGS[kind]))
+            _BROWSERS[kind] = browser
+        return browser
+
+
+async def close_browsers():
+    """Close the shared browsers and stop the Playwright driver."""
+    global _PLAYWRIGHT
+    async with _BROWSER_LOCK:
+        for browser in _BROWSERS.values():
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.warning("Error closing browser: %s", e)
+        _BROWSERS.clear()
+        if _PLAYWRIGHT is not None:
+            await _PLAYWRIGHT.stop()
+            _PLAYWRIGHT = None
+
 
 def get_random_user_agent() -> str:
     """Get a random user agent, preferring real-time generation."""
@@ -64,13 +389,44 @@ def get_random_user_agent() -> str:
     return random.choice(FALLBACK_USER_AGENTS)
 
 
+def _get_challenge_state(host: str) -> dict | None:
+    """Saved Layer 6 storage state for a host, if still fresh."""
+    entry = _CHALLENGE_STATE.get(host)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        del _CHALLENGE_STATE[host]
+        return None
+    _CHALLENGE_STATE.move_to_end(host)
+    return entry[1]
+
+
+def _put_challenge_state(host: str, state: dict):
+    _CHALLENGE_STATE[host] = (time.monotonic() + CHALLENGE_STATE_TTL, state)
+    _CHALLENGE_STATE.move_to_end(host)
+    while len(_CHALLENGE_STATE) > _CHALLENGE_STATE_SIZE:
+        _CHALLENGE_STATE.popitem(last=False)
+
+
+def get_host_fingerprint(url: str) -> tuple[dict, str]:
+    """(viewport, user_agent) for a URL's host, picked on first use and then kept."""
+    host = urlparse(url).hostname
+    fingerprint = _HOST_FINGERPRINTS.get(host)
+    if fingerprint is None:
+        fingerprint = _HOST_FINGERPRINTS[host] = (random.choice(VIEWPORTS), get_random_user_agent())
+        while len(_HOST_FINGERPRINTS) > _HOST_FINGERPRINTS_SIZE:
+            _HOST_FINGERPRINTS.popitem(last=False)
+    _HOST_FINGERPRINTS.move_to_end(host)
+    return fingerprint
+
+
 def get_browser_headers() -> dict:
     """Generate realistic browser headers."""
     return {
         "User-Agent": get_random_user_agent(),
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
         "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
+        "Accept-Encoding": ACCEPT_ENCODING,
         "DNT": "1",
         "Connection": "keep-alive",
         "Upgrade-Insecure-Requests": "1",
@@ -86,6 +442,112 @@ def get_browser_headers() -> dict:
     }
 
 
+# ============================================================================
+# URL SAFETY (SSRF GUARD)
+# ============================================================================
+
+# Guard lookups only: host -> (addresses, expires_at). The fetch clients resolve on their
+# own, which is why their connected address is checked again (ensure_public_peer)
+_DNS_CACHE: OrderedDict[str, tuple[list[str], float]] = OrderedDict()
+DNS_CACHE_TTL = 300  # seconds
+DNS_CACHE_SIZE = 1024
+
+
+async def _resolve(host: str) -> list[str]:
+    """Resolve a hostname to its IP addresses without blocking the event loop (cached)."""
+    cached = _DNS_CACHE.get(host)
+    if cached is not None:
+        if cached[1] > time.monotonic():
+            _DNS_CACHE.move_to_end(host)
+            return cached[0]
+        del _DNS_CACHE[host]
+
+    loop = asyncio.get_running_loop()
+    infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    addresses = list({info[4][0] for info in infos})
+    _DNS_CACHE[host] = (addresses, time.monotonic() + DNS_CACHE_TTL)
+    while len(_DNS_CACHE) > DNS_CACHE_SIZE:
+        _DNS_CACHE.popitem(last=False)
+    return addresses
+
+
+async def ensure_public_url(url: str):
+    """Reject URLs that resolve to private, loopback or otherwise non-public addresses."""
+    host = urlparse(url).hostname
+    if not host:
+        raise ValueError(f"Invalid URL (no hostname): {url}")
+
+    try:
+        addresses = await _resolve(host)
+    except socket.gaierror as e:
+        raise ValueError(f"Could not resolve host {host}: {e}")
+
+    for address in addresses:
+        if not ipaddress.ip_address(address).is_global:
+            logger.warning("Blocked fetch of %s: %s resolves to %s", url, host, address)
+            raise BlockedURLError(f"URL host {host} resolves to a private address")
+
+
+def ensure_public_peer(url: str, address: str | None):
+    """
+    Reject a response whose connection went to a non-public address.
+
+    Each client resolves the host again after ensure_public_url, so a rebinding
+    DNS server could hand it a private address; the body is discarded if so.
+    """
+    if address and not ipaddress.ip_address(address).is_global:
+        logger.warning("Blocked fetch of %s: connected to %s", url, address)
+        raise BlockedURLError(f"URL host {urlparse(url).hostname} connected to a private address")
+
+
+async def _follow_redirects(get, url: str, peer=None):
+    """
+    Call get(url) with redirects disabled and follow Location headers by hand,
+    vetting every hop (and, when peer(response) is given, the address each
+    response actually came from). Returns the final response.
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        response = await get(url)
+        if peer is not None:
+            ensure_public_peer(url, peer(response))
+        location = response.headers.get("location")
+        if response.status_code not in REDIRECT_STATUS_CODES or not location:
+            return response
+        url = urljoin(url, location)
+        await ensure_public_url(url)
+    raise ValueError(f"Too many redirects fetching {url}")
+
+
+def _requests_peer_hook(response, *args, **kwargs):
+    """
+    requests response hook (Cloudscraper): vet the connected address before the
+    body is read. Hooks run on every request the session makes, including the
+    ones Cloudscraper sends while solving a challenge.
+    """
+    sock = getattr(getattr(response.raw, "connection", None), "sock", None)
+    if sock is None:
+        # urllib3 detaches the socket from a connection the server will close;
+        # http.client's response still holds it
+        sock = getattr(getattr(getattr(response.raw, "_fp", None), "fp", None), "raw", None)
+        sock = getattr(sock, "_sock", None)
+    if sock is None:
+        raise BlockedURLError(f"Could not verify the address {response.url} was served from")
+    ensure_public_peer(response.url, sock.getpeername()[0])
+
+
+async def _httpx_get(client: httpx.AsyncClient, url: str, headers: dict) -> httpx.Response:
+    """GET with httpx, checking the connected address while the connection is still open."""
+    response = await client.send(client.build_request("GET", url, headers=headers), stream=True)
+    try:
+        stream = response.extensions.get("network_stream")
+        server = stream.get_extra_info("server_addr") if stream else None
+        ensure_public_peer(url, server[0] if server else None)
+        await response.aread()
+    finally:
+        await response.aclose()
+    return response
+
+
 # ============================================================================
 # LAYER 1: curl_cffi (TLS Fingerprint Impersonation)
 # ============================================================================
@@ -95,46 +557,55 @@ async def fetch_with_curl_cffi(url: str) -> str | None:
     Layer 1: curl_cffi with TLS fingerprint impersonation.
     Mimics Chrome's exact JA3/TLS fingerprint - bypasses most basic detection.
     """
-    logger.info(f"[Layer 1] curl_cffi with TLS impersonation: {url}")
+    url_str = str(url)
+    logger.info("[Layer 1] curl_cffi with TLS impersonation: %s", url_str)
+    session = get_curl_session()
 
     for attempt, impersonate in enumerate(random.sample(CHROME_VERSIONS, min(3, len(CHROME_VERSIONS)))):
         try:
-            logger.debug(f"  Attempt {attempt + 1} with impersonate={impersonate}")
-
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: curl_requests.get(
-                    str(url),
-                    impersonate=impersonate,
-                    timeout=25,
-                    allow_redirects=True,
-                    headers={
-                        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                        "Accept-Language": "en-US,en;q=0.9",
-                        "Accept-Encoding": "gzip, deflate, br",
-                    }
-                )
+            logger.debug("  Attempt %d with impersonate=%s", attempt + 1, impersonate)
+
+            headers = {
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "en-US,en;q=0.9",
+                "Accept-Encoding": ACCEPT_ENCODING,
+                **_conditional_headers(url_str),
+            }
+            response = await _follow_redirects(
+                lambda u: session.get(u, impersonate=impersonate, allow_redirects=False, headers=headers),
+                url_str,
+                peer=lambda r: r.primary_ip,
             )
 
-            if response.status_code in [403, 429, 503, 520, 521, 522, 523, 524]:
-                logger.warning(f"  curl_cffi got {response.status_code}, trying next...")
-                await asyncio.sleep(random.uniform(1.0, 2.0))
+            if response.status_code == 304 and (cached := _not_modified_content(url_str)):
+                logger.info("  [Layer 1] 304 Not Modified - reusing %d cached chars", len(cached))
+                return cached
+
+            if response.status_code in TERMINAL_STATUS_CODES:
+                raise TerminalStatusError(url_str, response.status_code)
+
+            if response.status_code in BLOCKED_STATUS_CODES:
+                logger.warning("  curl_cffi got %s, trying next...", response.status_code)
+                if response.status_code in RATE_LIMIT_STATUS_CODES:
+                    await asyncio.sleep(random.uniform(1.0, 2.0))
                 continue
 
-            if response.status_code == 200:
-                content = response.text
-                if len(content) > 500 and "blocked" not in content.lower()[:1000]:
-                    logger.info(f"  [Layer 1] SUCCESS - Got {len(content)} chars")
+            # Check raw size before paying for text decoding
+            if response.status_code == 200 and len(response.content) > 500:
+                content = response.text[:_MAX_HTML_BYTES]
+                if len(content) > 500 and not _BLOCKED_RE.search(content, 0, 1000):
+                    logger.info("  [Layer 1] SUCCESS - Got %d chars", len(content))
+                    _remember_validators(url_str, response, content)
                     return content
 
-            logger.warning(f"  curl_cffi status {response.status_code}, content too short or blocked")
+            logger.warning("  curl_cffi status %s, content too short or blocked", response.status_code)
 
+        except FetchAbortedError:
+            raise
         except Exception as e:
-            logger.warning(f"  curl_cffi attempt {attempt + 1} failed: {e}")
-            await asyncio.sleep(random.uniform(0.5, 1.5))
+            logger.warning("  curl_cffi attempt %d failed: %s", attempt + 1, e)
 
-    logger.info("  [Layer 1] FAILED - Moving to Layer 2")
+    logger.info("  [Layer 1] FAILED")
     return None
 
 
@@ -147,36 +618,43 @@ async def fetch_with_httpx(url: str, max_retries: int = 2) -> str | None:
     Layer 2: httpx with full browser headers and HTTP/2.
     Fast and works for sites without aggressive protection.
     """
-    logger.info(f"[Layer 2] httpx with browser headers: {url}")
+    url_str = str(url)
+    logger.info("[Layer 2] httpx with browser headers: %s", url_str)
+
+    client = get_httpx_client()
 
     for attempt in range(max_retries):
-        headers = get_browser_headers()
+        headers = get_browser_headers() | _conditional_headers(url_str)
 
         try:
-            async with httpx.AsyncClient(
-                timeout=20.0,
-                follow_redirects=True,
-                http2=True,
-            ) as client:
-                if attempt > 0:
-                    await asyncio.sleep(random.uniform(1.0, 2.0))
+            response = await _follow_redirects(lambda u: _httpx_get(client, u, headers), url_str)
 
-                response = await client.get(str(url), headers=headers)
+            if response.status_code == 304 and (cached := _not_modified_content(url_str)):
+                logger.info("  [Layer 2] 304 Not Modified - reusing %d cached chars", len(cached))
+                return cached
 
-                if response.status_code in [403, 429, 503, 520, 521, 522, 523, 524]:
-                    logger.warning(f"  httpx blocked with {response.status_code}")
-                    continue
+            if response.status_code in TERMINAL_STATUS_CODES:
+                raise TerminalStatusError(url_str, response.status_code)
 
-                if response.status_code == 200:
-                    content = response.text
-                    if len(content) > 500:
-                        logger.info(f"  [Layer 2] SUCCESS - Got {len(content)} chars")
-                        return content
+            if response.status_code in BLOCKED_STATUS_CODES:
+                logger.warning("  httpx blocked with %s", response.status_code)
+                if response.status_code in RATE_LIMIT_STATUS_CODES and attempt < max_retries - 1:
+                    await asyncio.sleep(random.uniform(1.0, 2.0))
+                continue
+
+            if response.status_code == 200 and len(response.content) > 500:
+                content = response.text[:_MAX_HTML_BYTES]
+                if len(content) > 500:
+                    logger.info("  [Layer 2] SUCCESS - Got %d chars", len(content))
+                    _remember_validators(url_str, response, content)
+                    return content
 
+        except FetchAbortedError:
+            raise
         except Exception as e:
-            logger.warning(f"  httpx attempt {attempt + 1} failed: {e}")
+            logger.warning("  httpx attempt %d failed: %s", attempt + 1, e)
 
-    logger.info("  [Layer 2] FAILED - Moving to Layer 3")
+    logger.info("  [Layer 2] FAILED")
     return None
 
 
@@ -189,7 +667,8 @@ async def fetch_with_cloudscraper(url: str) -> str | None:
     Layer 3: Cloudscraper - solves Cloudflare JS challenges without browser.
     Uses a JS interpreter to solve challenges, much faster than Playwright.
     """
-    logger.info(f"[Layer 3] Cloudscraper JS challenge solver: {url}")
+    url_str = str(url)
+    logger.info("[Layer 3] Cloudscraper JS challenge solver: %s", url_str)
 
     try:
         scraper = cloudscraper.create_scraper(
@@ -200,40 +679,42 @@ async def fetch_with_cloudscraper(url: str) -> str | None:
             },
             delay=random.uniform(3, 7),
         )
-
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: scraper.get(
-                str(url),
-                timeout=30,
-                headers={
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "DNT": "1",
-                    "Upgrade-Insecure-Requests": "1",
-                }
-            )
+        scraper.hooks['response'].append(_requests_peer_hook)
+
+        headers = {
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "DNT": "1",
+            "Upgrade-Insecure-Requests": "1",
+        }
+        loop = asyncio.get_running_loop()
+        response = await _follow_redirects(
+            lambda u: loop.run_in_executor(
+                _SCRAPE_POOL,
+                lambda: scraper.get(u, timeout=30, allow_redirects=False, headers=headers),
+            ),
+            url_str,
         )
 
-        if response.status_code in [403, 429, 503, 520, 521, 522, 523, 524]:
-            logger.warning(f"  Cloudscraper got {response.status_code}")
+        if response.status_code in BLOCKED_STATUS_CODES:
+            logger.warning("  Cloudscraper got %s", response.status_code)
             return None
 
-        if response.status_code == 200:
-            content = response.text
-            block_indicators = ['blocked', 'captcha', 'challenge', 'attention required', 'access denied']
-            if len(content) > 500 and not any(ind in content.lower()[:2000] for ind in block_indicators):
-                logger.info(f"  [Layer 3] SUCCESS - Got {len(content)} chars")
+        if response.status_code == 200 and len(response.content) > 500:
+            content = response.text[:_MAX_HTML_BYTES]
+            if len(content) > 500 and not _BLOCK_PAGE_RE.search(content, 0, 2000):
+                logger.info("  [Layer 3] SUCCESS - Got %d chars", len(content))
                 return content
             else:
                 logger.warning("  Cloudscraper content may be blocked page")
 
+    except FetchAbortedError:
+        raise
     except Exception as e:
-        logger.warning(f"  Cloudscraper failed: {e}")
+        logger.warning("  Cloudscraper failed: %s", e)
 
-    logger.info("  [Layer 3] FAILED - Moving to Layer 4")
+    logger.info("  [Layer 3] FAILED")
     return None
 
 
@@ -241,35 +722,87 @@ async def fetch_with_cloudscraper(url: str) -> str | None:
 # LAYER 4: Playwright Basic Stealth
 # ============================================================================
 
-async def fetch_with_playwright_basic(url: str) -> str | None:
+# Rendered-content condition used instead of networkidle / fixed sleeps
+_TEXT_READY_JS = f"document.body && document.body.innerText.length > {MIN_TEXT_CHARS}"
+
+
+async def _wait_for_text(page, timeout_ms: int = 5000) -> bool:
+    """Wait until the page has rendered meaningful body text; False on timeout."""
+    try:
+        await page.wait_for_function(_TEXT_READY_JS, timeout=timeout_ms)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def _page_content(page, as_text: bool) -> str:
+    """Page text (or serialized HTML), capped at _MAX_HTML_BYTES."""
+    if as_text:
+        # Rendered text only: no full-DOM serialization over CDP and no HTML parse afterwards
+        content = await page.evaluate("() => document.body ? document.body.innerText : ''")
+    else:
+        content = await page.content()
+    return content[:_MAX_HTML_BYTES]
+
+
+def _usable(content: str, as_text: bool) -> bool:
+    return len(content) > (MIN_TEXT_CHARS if as_text else MIN_HTML_CHARS)
+
+
+async def _is_public_request(url: str) -> bool:
+    """Whether a browser request may go out (non-HTTP schemes never leave the browser)."""
+    if urlparse(url).scheme not in ('http', 'https'):
+        return True
+    try:
+        await ensure_public_url(url)
+        return True
+    except (ValueError, BlockedURLError):
+        return False
+
+
+async def _guard_route(route, blocked_types):
+    """Abort blocked resource types and any request (incl. redirects) to a non-public host."""
+    request = route.request
+    if BLOCK_RESOURCES and request.resource_type in blocked_types:
+        await route.abort()
+    elif not await _is_public_request(request.url):
+        logger.warning("  Blocked browser request to %s", request.url)
+        await route.abort('blockedbyclient')
+    else:
+        await route.continue_()
+
+
+async def _block_heavy_resources(route):
+    """Playwright route handler: SSRF guard, plus abort images, media, fonts and stylesheets."""
+    await _guard_route(route, BLOCKED_RESOURCE_TYPES)
+
+
+async def _block_challenge_resources(route):
+    """Playwright route handler for the challenge layer: like _block_heavy_resources but keeps CSS."""
+    await _guard_route(route, CHALLENGE_BLOCKED_RESOURCE_TYPES)
+
+
+async def _ensure_public_page(page, response):
+    """Reject a page that ended up on, or was served from, a non-public address."""
+    await ensure_public_url(page.url)
+    server = await response.server_addr() if response is not None else None
+    if server:
+        ensure_public_peer(page.url, server['ipAddress'])
+
+
+async def fetch_with_playwright_basic(url: str, raw: bool = False) -> str | None:
     """
     Layer 4: Playwright with basic stealth mode.
     Real browser but minimal human simulation.
     """
-    logger.info(f"[Layer 4] Playwright basic stealth: {url}")
+    logger.info("[Layer 4] Playwright basic stealth: %s", url)
+    as_text = PLAYWRIGHT_TEXT_ONLY and not raw
 
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-infobars',
-                    '--disable-extensions',
-                    '--disable-gpu',
-                    '--disable-software-rasterizer',
-                    '--window-position=0,0',
-                    '--ignore-certificate-errors',
-                    '--ignore-certificate-errors-spki-list',
-                    '--disable-features=IsolateOrigins,site-per-process',
-                ]
-            )
+        async with _PLAYWRIGHT_SEM:
+            browser = await _get_browser("basic")
 
-            viewport = random.choice(VIEWPORTS)
-            user_agent = get_random_user_agent()
+            viewport, user_agent = get_host_fingerprint(url)
 
             context = await browser.new_context(
                 viewport=viewport,
@@ -278,33 +811,35 @@ async def fetch_with_playwright_basic(url: str) -> str | None:
                 timezone_id='America/New_York',
                 java_script_enabled=True,
                 bypass_csp=True,
+                service_workers='block',
             )
 
-            await context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
-                Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']});
-                window.chrome = {runtime: {}};
-            """)
+            try:
+                await context.route("**/*", _block_heavy_resources)
 
-            page = await context.new_page()
-            response = await page.goto(url, wait_until='domcontentloaded', timeout=25000)
+                await context.add_init_script(_STEALTH_JS_BASIC)
 
-            if response and response.status in [403, 429, 503]:
-                logger.warning(f"  Playwright basic got {response.status}")
-                await browser.close()
-                return None
+                page = await context.new_page()
+                response = await page.goto(url, wait_until='domcontentloaded', timeout=25000)
 
-            await asyncio.sleep(random.uniform(0.5, 1.5))
-            content = await page.content()
-            await browser.close()
+                if response and response.status in [403, 429, 503]:
+                    logger.warning("  Playwright basic got %s", response.status)
+                    return None
 
-            if len(content) > 500:
-                logger.info(f"  [Layer 4] SUCCESS - Got {len(content)} chars")
-                return content
+                await asyncio.sleep(random.uniform(0.5, 1.5))
+                await _ensure_public_page(page, response)
+                content = await _page_content(page, as_text)
 
+                if _usable(content, as_text):
+                    logger.info("  [Layer 4] SUCCESS - Got %d chars", len(content))
+                    return content
+            finally:
+                await context.close()
+
+    except FetchAbortedError:
+        raise
     except Exception as e:
-        logger.warning(f"  Playwright basic failed: {e}")
+        logger.warning("  Playwright basic failed: %s", e)
 
     logger.info("  [Layer 4] FAILED - Moving to Layer 5")
     return None
@@ -314,34 +849,19 @@ async def fetch_with_playwright_basic(url: str) -> str | None:
 # LAYER 5: Playwright with Human Simulation
 # ============================================================================
 
-async def fetch_with_playwright_human(url: str) -> str | None:
+async def fetch_with_playwright_human(url: str, raw: bool = False) -> str | None:
     """
     Layer 5: Playwright with full human simulation.
     Mouse movements, scrolling, realistic delays.
     """
-    logger.info(f"[Layer 5] Playwright with human simulation: {url}")
+    logger.info("[Layer 5] Playwright with human simulation: %s", url)
+    as_text = PLAYWRIGHT_TEXT_ONLY and not raw
 
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-infobars',
-                    '--disable-extensions',
-                    '--window-position=0,0',
-                    '--ignore-certificate-errors',
-                    '--disable-features=IsolateOrigins,site-per-process',
-                    '--disable-web-security',
-                    '--disable-features=BlockInsecurePrivateNetworkRequests',
-                ]
-            )
+        async with _PLAYWRIGHT_SEM:
+            browser = await _get_browser("human")
 
-            viewport = random.choice(VIEWPORTS)
-            user_agent = get_random_user_agent()
+            viewport, user_agent = get_host_fingerprint(url)
 
             context = await browser.new_context(
                 viewport=viewport,
@@ -352,89 +872,72 @@ async def fetch_with_playwright_human(url: str) -> str | None:
                 permissions=['geolocation'],
                 java_script_enabled=True,
                 bypass_csp=True,
+                service_workers='block',
                 extra_http_headers={
                     'Accept-Language': 'en-US,en;q=0.9',
                     'Accept-Encoding': 'gzip, deflate, br',
                 }
             )
 
-            await context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => {
-                        const plugins = [
-                            {name: 'Chrome PDF Plugin', filename: 'internal-pdf-viewer'},
-                            {name: 'Chrome PDF Viewer', filename: 'mhjfbmdgcfjbbpaeojofohoefgiehjai'},
-                            {name: 'Native Client', filename: 'internal-nacl-plugin'},
-                        ];
-                        plugins.length = 3;
-                        return plugins;
-                    }
-                });
-                Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']});
-                window.chrome = {runtime: {}, loadTimes: function() {}, csi: function() {}, app: {}};
-                const originalQuery = window.navigator.permissions.query;
-                window.navigator.permissions.query = (parameters) => (
-                    parameters.name === 'notifications' ?
-                        Promise.resolve({state: Notification.permission}) :
-                        originalQuery(parameters)
-                );
-                delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
-                delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
-                delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
-                const getParameter = WebGLRenderingContext.prototype.getParameter;
-                WebGLRenderingContext.prototype.getParameter = function(parameter) {
-                    if (parameter === 37445) return 'Intel Inc.';
-                    if (parameter === 37446) return 'Intel Iris OpenGL Engine';
-                    return getParameter.apply(this, arguments);
-                };
-            """)
-
-            page = await context.new_page()
-            response = await page.goto(url, wait_until='networkidle', timeout=35000)
-
-            if response and response.status in [403, 429, 503]:
-                logger.warning(f"  Playwright human got {response.status}")
-                await browser.close()
-                return None
-
-            await asyncio.sleep(random.uniform(1.0, 2.0))
-
-            # Random mouse movements
-            for _ in range(random.randint(2, 5)):
-                x = random.randint(100, viewport['width'] - 100)
-                y = random.randint(100, viewport['height'] - 100)
-                await page.mouse.move(x, y)
-                await asyncio.sleep(random.uniform(0.1, 0.3))
-
-            # Smooth scroll
-            await page.evaluate("""
-                async () => {
-                    await new Promise(resolve => {
-                        let totalHeight = 0;
-                        const distance = Math.floor(Math.random() * 100) + 200;
-                        const timer = setInterval(() => {
-                            window.scrollBy(0, distance);
-                            totalHeight += distance;
-                            if (totalHeight >= Math.min(document.body.scrollHeight / 2, 2000)) {
-                                clearInterval(timer);
-                                resolve();
-                            }
-                        }, Math.floor(Math.random() * 50) + 80);
-                    });
-                }
-            """)
-
-            await asyncio.sleep(random.uniform(0.5, 1.0))
-            content = await page.content()
-            await browser.close()
-
-            if len(content) > 500:
-                logger.info(f"  [Layer 5] SUCCESS - Got {len(content)} chars")
-                return content
+            try:
+                await context.route("**/*", _block_heavy_resources)
+
+                await context.add_init_script(_STEALTH_JS_HUMAN)
+
+                page = await context.new_page()
+                # networkidle stalls on analytics beacons; wait for rendered text instead
+                response = await page.goto(url, wait_until='domcontentloaded', timeout=15000)
+
+                if response and response.status in [403, 429, 503]:
+                    logger.warning("  Playwright human got %s", response.status)
+                    return None
+
+                await _wait_for_text(page)
+
+                if AGGRESSIVE_STEALTH:
+                    # Random mouse movements
+                    for _ in range(random.randint(2, 5)):
+                        x = random.randint(100, viewport['width'] - 100)
+                        y = random.randint(100, viewport['height'] - 100)
+                        await page.mouse.move(x, y)
+                        await asyncio.sleep(random.uniform(0.1, 0.3))
+
+                    # Smooth scroll
+                    await page.evaluate("""
+                        async () => {
+                            await new Promise(resolve => {
+                                let totalHeight = 0;
+                                const distance = Math.floor(Math.random() * 100) + 200;
+                                const timer = setInterval(() => {
+                                    window.scrollBy(0, distance);
+                                    totalHeight += distance;
+                                    if (totalHeight >= Math.min(document.body.scrollHeight / 2, 2000)) {
+                                        clearInterval(timer);
+                                        resolve();
+                                    }
+                                }, Math.floor(Math.random() * 50) + 80);
+                            });
+                        }
+                    """)
+
+                    await asyncio.sleep(random.uniform(0.5, 1.0))
+                else:
+                    # One jump to trigger lazy-loaded content
+                    await page.evaluate("window.scrollTo(0, Math.min(document.body.scrollHeight, 4000))")
+                    await asyncio.sleep(0.3)
+                await _ensure_public_page(page, response)
+                content = await _page_content(page, as_text)
+
+                if _usable(content, as_text):
+                    logger.info("  [Layer 5] SUCCESS - Got %d chars", len(content))
+                    return content
+            finally:
+                await context.close()
 
+    except FetchAbortedError:
+        raise
     except Exception as e:
-        logger.warning(f"  Playwright human failed: {e}")
+        logger.warning("  Playwright human failed: %s", e)
 
     logger.info("  [Layer 5] FAILED - Moving to Layer 6")
     return None
@@ -444,34 +947,23 @@ async def fetch_with_playwright_human(url: str) -> str | None:
 # LAYER 6: Playwright Challenge Bypass
 # ============================================================================
 
-async def fetch_with_playwright_challenge(url: str) -> str | None:
+async def fetch_with_playwright_challenge(url: str, raw: bool = False) -> str | None:
     """
     Layer 6: Playwright with challenge/Cloudflare bypass.
     Waits for JS challenges to complete, longer timeouts.
     """
-    logger.info(f"[Layer 6] Playwright challenge bypass: {url}")
+    logger.info("[Layer 6] Playwright challenge bypass: %s", url)
+    as_text = PLAYWRIGHT_TEXT_ONLY and not raw
 
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-accelerated-2d-canvas',
-                    '--no-first-run',
-                    '--no-zygote',
-                    '--single-process',
-                    '--disable-gpu',
-                    '--ignore-certificate-errors',
-                    '--disable-features=IsolateOrigins,site-per-process',
-                ]
-            )
+        async with _PLAYWRIGHT_SEM:
+            browser = await _get_browser("challenge")
+
+            # Reuse a clearance earned on this host earlier, so the challenge is usually skipped
+            host = urlparse(url).hostname
+            saved = _get_challenge_state(host)
 
-            viewport = random.choice(VIEWPORTS)
-            user_agent = get_random_user_agent()
+            viewport, user_agent = get_host_fingerprint(url)
 
             context = await browser.new_context(
                 viewport=viewport,
@@ -480,56 +972,51 @@ async def fetch_with_playwright_challenge(url: str) -> str | None:
                 timezone_id='America/New_York',
                 java_script_enabled=True,
                 bypass_csp=True,
+                service_workers='block',
+                storage_state=saved,
             )
 
-            await context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                Object.defineProperty(navigator, 'plugins', {get: () => [1,2,3,4,5]});
-                Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']});
-                window.chrome = {runtime: {}, loadTimes: () => {}, csi: () => {}};
-                delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
-                delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
-                delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
-                delete window.__nightmare;
-                delete window._phantom;
-                delete window.callPhantom;
-            """)
-
-            page = await context.new_page()
-            logger.debug(f"  First navigation to {url}")
-            await page.goto(url, wait_until='domcontentloaded', timeout=30000)
-
-            logger.debug("  Waiting for potential challenge...")
-            await asyncio.sleep(5)
-
-            content = await page.content()
-            challenge_indicators = [
-                'challenge-running', 'cf-browser-verification',
-                'please wait', 'checking your browser', 'ddos-guard',
-                'just a moment', 'verify you are human'
-            ]
-
-            if any(indicator in content.lower() for indicator in challenge_indicators):
-                logger.debug("  Challenge detected, waiting longer...")
-                await asyncio.sleep(8)
-                try:
-                    await page.wait_for_load_state('networkidle', timeout=15000)
-                except:
-                    pass
-
-            await page.evaluate("window.scrollBy(0, 500)")
-            await asyncio.sleep(random.uniform(1.0, 2.0))
-
-            content = await page.content()
-            await browser.close()
-
-            if len(content) > 500:
-                if not any(indicator in content.lower() for indicator in challenge_indicators):
-                    logger.info(f"  [Layer 6] SUCCESS - Got {len(content)} chars")
-                    return content
+            try:
+                await context.route("**/*", _block_challenge_resources)
+
+                await context.add_init_script(_STEALTH_JS_CHALLENGE)
 
+                page = await context.new_page()
+                logger.debug("  First navigation to %s", url)
+                response = await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+
+                logger.debug("  Waiting for potential challenge...")
+                # Real pages clear this at once; challenge interstitials have little text and wait it out
+                await _wait_for_text(page)
+
+                content = (await page.content())[:_MAX_HTML_BYTES]
+                if _CHALLENGE_RE.search(content):
+                    logger.debug("  Challenge detected, waiting longer...")
+                    await asyncio.sleep(8)
+                    try:
+                        await page.wait_for_load_state('networkidle', timeout=15000)
+                    except PlaywrightTimeoutError:
+                        pass
+
+                await page.evaluate("window.scrollBy(0, 500)")
+                await asyncio.sleep(random.uniform(1.0, 2.0))
+
+                # After a challenge the page may have navigated on; the route guard vetted each hop
+                await _ensure_public_page(page, response)
+                content = await _page_content(page, as_text)
+
+                if _usable(content, as_text):
+                    if not _CHALLENGE_RE.search(content):
+                        logger.info("  [Layer 6] SUCCESS - Got %d chars", len(content))
+                        _put_challenge_state(host, await context.storage_state())
+                        return content
+            finally:
+                await context.close()
+
+    except FetchAbortedError:
+        raise
     except Exception as e:
-        logger.warning(f"  Playwright challenge failed: {e}")
+        logger.warning("  Playwright challenge failed: %s", e)
 
     logger.error("  [Layer 6] FAILED - All layers exhausted")
     return None
@@ -539,16 +1026,36 @@ async def fetch_with_playwright_challenge(url: str) -> str | None:
 # HTML CONTENT CLEANER
 # ============================================================================
 
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Elements that never carry page content
+_STRIP_TAGS = ('script', 'style', 'nav', 'footer', 'header', 'aside', 'noscript', 'iframe', 'svg')
+
+
+def collapse_text(text: str) -> str:
+    """Collapse whitespace runs and cap length (for already-extracted text)."""
+    return _WHITESPACE_RE.sub(' ', text).strip()[:50000]
+
+
 def clean_html_content(content: str) -> str:
     """Clean HTML and extract readable text for LLM processing."""
+    # Not worth (or not safe) parsing: tiny pages, JSON payloads, plain text
+    head = content[:1000].lstrip()
+    if len(content) < 2000 or head.startswith(('{', '[')) or '<' not in head:
+        return content[:50000]
+
     try:
-        soup = BeautifulSoup(content, 'lxml')
+        try:
+            tree = lxml_html.fromstring(content)
+        except ValueError:
+            # lxml rejects str input that carries an XML encoding declaration
+            tree = lxml_html.fromstring(content.encode())
 
-        # Remove unwanted elements
-        for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'noscript', 'iframe', 'svg']):
-            element.decompose()
+        # Remove unwanted elements (keeping the text that follows them) and comments
+        etree.strip_elements(tree, *_STRIP_TAGS, etree.Comment, with_tail=False)
 
-        text = soup.get_text(separator='\n', strip=True)
+        # Collapse whitespace runs - indentation and blank lines are pure token overhead
+        text = _WHITESPACE_RE.sub(' ', ' '.join(tree.itertext())).strip()
 
         if len(text) < 500:
             return content[:50000]
@@ -556,7 +1063,7 @@ def clean_html_content(content: str) -> str:
         return text[:50000]
 
     except Exception as e:
-        logger.warning(f"HTML cleaning failed: {e}")
+        logger.warning("HTML cleaning failed: %s", e)
         return content[:50000]
 
 
@@ -564,43 +1071,138 @@ def clean_html_content(content: str) -> str:
 # MAIN FETCH ORCHESTRATOR
 # ============================================================================
 
-async def fetch_page_content(url: str) -> str:
+# Hard cap on one URL's trip through all layers (excluding time queued for _SCRAPE_SEM).
+# Layers 1-3 plus a Layer 4-6 escalation fit; stuck challenge pages don't hold a context for minutes
+FETCH_BUDGET_SECONDS = 90
+
+# In-flight fetches keyed by (url, raw); concurrent callers await the same task
+_INFLIGHT: dict[tuple[str, bool], asyncio.Task] = {}
+
+# Non-browser layers raced against each other, in preference order
+LIGHT_LAYERS = (
+    ("Layer 1", fetch_with_curl_cffi),
+    ("Layer 2", fetch_with_httpx),
+    ("Layer 3", fetch_with_cloudscraper),
+)
+# Head start for Layer 1 before the others launch, so it usually wins without wasted requests
+LIGHT_LAYER_HEAD_START = 0.2
+
+
+async def _race_light_layers(url: str) -> str | None:
+    """
+    Run layers 1-3 concurrently and return the first usable content.
+    Raises FetchAbortedError if a layer got 401/404/410 or hit the SSRF guard, skipping Playwright.
+
+    A failing layer no longer adds its full timeout before the next one starts;
+    the total is bounded by the slowest layer only when all three fail. The
+    TaskGroup waits for cancelled losers to unwind, so none outlive the race.
+    """
+    winner: list[str] = []
+    terminal: list[FetchAbortedError] = []
+    tasks: list[asyncio.Task] = []
+
+    def cancel_others():
+        current = asyncio.current_task()
+        for task in tasks:
+            if task is not current:
+                task.cancel()
+
+    async def run(delay: float, name: str, fetch):
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            content = await fetch(url)
+        except FetchAbortedError as e:
+            if not winner and not terminal:
+                terminal.append(e)
+                logger.warning("  [%s] %s - not trying other layers", name, e)
+                cancel_others()
+            return
+        except Exception as e:
+            logger.warning("  [%s] raised: %s", name, e)
+            return
+        if content and not winner and not terminal:
+            winner.append(content)
+            logger.info("  [%s] won the race", name)
+            cancel_others()
+
+    async with asyncio.TaskGroup() as tg:
+        for i, (name, fetch) in enumerate(LIGHT_LAYERS):
+            tasks.append(tg.create_task(run(LIGHT_LAYER_HEAD_START if i else 0, name, fetch)))
+
+    if winner:
+        return winner[0]
+    if terminal:
+        raise terminal[0]
+    logger.info("  Layers 1-3 FAILED - Moving to Layer 4")
+    return None
+
+
+async def fetch_page_content(url: str, raw: bool = False) -> str:
     """
     Ultra-resilient content fetcher with 6-layer fallback system.
     Tries increasingly sophisticated methods until one succeeds.
+
+    Returns cleaned page text; raw=True returns the fetched HTML (for debugging).
+    Concurrent calls for the same URL share one fetch.
     """
+    key = (url, raw)
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.create_task(_fetch_page_content(url, raw))
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+    else:
+        logger.info("Joining in-flight fetch of %s", url)
+    # Shielded so one caller cancelling doesn't abort the fetch for the others
+    return await asyncio.shield(task)
+
+
+async def _fetch_page_content(url: str, raw: bool) -> str:
     logger.info("=" * 60)
-    logger.info(f"FETCHING: {url}")
+    logger.info("FETCHING: %s", url)
     logger.info("=" * 60)
 
-    # Layer 1: curl_cffi (TLS fingerprint - fastest)
-    content = await fetch_with_curl_cffi(url)
-    if content:
-        return clean_html_content(content)
+    await ensure_public_url(url)
 
-    # Layer 2: httpx (fast HTTP client)
-    content = await fetch_with_httpx(url)
+    async with _SCRAPE_SEM:
+        try:
+            async with asyncio.timeout(FETCH_BUDGET_SECONDS):
+                content, is_text = await _fetch_through_layers(url, raw)
+        except TimeoutError:
+            logger.error("  Fetch budget of %ds exhausted for %s", FETCH_BUDGET_SECONDS, url)
+            raise Exception(f"Failed to fetch content from {url} - gave up after {FETCH_BUDGET_SECONDS}s")
+    if raw:
+        return content
+    if is_text:
+        return collapse_text(content)
+    # lxml releases the GIL while parsing, so concurrent fetches clean in parallel
+    return await asyncio.to_thread(clean_html_content, content)
+
+
+async def _fetch_through_layers(url: str, raw: bool = False) -> tuple[str, bool]:
+    """Try each layer in turn (1-3 raced); returns (content, whether it is already plain text)."""
+    # Layers 1-3: raced (curl_cffi first, httpx/Cloudscraper after a head start)
+    content = await _race_light_layers(url)
     if content:
-        return clean_html_content(content)
+        return content, False
 
-    # Layer 3: Cloudscraper (JS challenge solver)
-    content = await fetch_with_cloudscraper(url)
-    if content:
-        return clean_html_content(content)
+    # Layers 4-6 return rendered text unless raw HTML was asked for
+    as_text = PLAYWRIGHT_TEXT_ONLY and not raw
 
     # Layer 4: Playwright basic
-    content = await fetch_with_playwright_basic(url)
+    content = await fetch_with_playwright_basic(url, raw)
     if content:
-        return clean_html_content(content)
+        return content, as_text
 
     # Layer 5: Playwright with human simulation
-    content = await fetch_with_playwright_human(url)
+    content = await fetch_with_playwright_human(url, raw)
     if content:
-        return clean_html_content(content)
+        return content, as_text
 
     # Layer 6: Playwright challenge bypass
-    content = await fetch_with_playwright_challenge(url)
+    content = await fetch_with_playwright_challenge(url, raw)
     if content:
-        return clean_html_content(content)
+        return content, as_text
 
     raise Exception(f"Failed to fetch content from {url} - All 6 layers exhausted")
@@ -26,7 +26,7 @@ echo "[4/4] Verifying all imports..."
 python -c "
 import httpx
 import playwright
-from bs4 import BeautifulSoup
+from lxml import html
 from curl_cffi import requests
 from fake_useragent import UserAgent
 print('All imports OK!')
@@ -0,0 +1,99 @@
+-- Transactional ingest write path
+-- Writes a program and all of its child rows in a single call / single transaction.
+-- Called by the agent via supabase.rpc("create_program_with_children", {...}).
+
+CREATE OR REPLACE FUNCTION public.create_program_with_children(
+  p_program jsonb,
+  p_rules jsonb DEFAULT '[]'::jsonb,
+  p_requirements jsonb DEFAULT '[]'::jsonb,
+  p_deadlines jsonb DEFAULT '[]'::jsonb,
+  p_source jsonb DEFAULT NULL,
+  p_reviews jsonb DEFAULT '[]'::jsonb,
+  p_program_id uuid DEFAULT NULL
+)
+RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_program_id uuid;
+BEGIN
+  IF p_program_id IS NULL THEN
+    INSERT INTO public.programs (
+      name, provider, level, funding_type, countries_eligible, countries_of_study,
+      fields, official_url, description, who_wins, rejection_reasons, status,
+      last_verified_at, application_url, benefits, contact_email, host_institution,
+      duration, age_min, age_max, gpa_min, language_requirements, award_amount,
+      number_of_awards, is_renewable
+    )
+    SELECT
+      r.name, r.provider, r.level, r.funding_type, r.countries_eligible, r.countries_of_study,
+      r.fields, r.official_url, r.description, r.who_wins, r.rejection_reasons, r.status,
+      r.last_verified_at, r.application_url, r.benefits, r.contact_email, r.host_institution,
+      r.duration, r.age_min, r.age_max, r.gpa_min, r.language_requirements, r.award_amount,
+      r.number_of_awards, r.is_renewable
+    FROM jsonb_populate_record(NULL::public.programs, p_program) AS r
+    RETURNING id INTO v_program_id;
+  ELSE
+    UPDATE public.programs p SET (
+      name, provider, level, funding_type, countries_eligible, countries_of_study,
+      fields, official_url, description, who_wins, rejection_reasons, status,
+      last_verified_at, application_url, benefits, contact_email, host_institution,
+      duration, age_min, age_max, gpa_min, language_requirements, award_amount,
+      number_of_awards, is_renewable
+    ) = (
+      r.name, r.provider, r.level, r.funding_type, r.countries_eligible, r.countries_of_study,
+      r.fields, r.official_url, r.description, r.who_wins, r.rejection_reasons, r.status,
+      r.last_verified_at, r.application_url, r.benefits, r.contact_email, r.host_institution,
+      r.duration, r.age_min, r.age_max, r.gpa_min, r.language_requirements, r.award_amount,
+      r.number_of_awards, r.is_renewable
+    )
+    FROM jsonb_populate_record(NULL::public.programs, p_program) AS r
+    WHERE p.id = p_program_id
+    RETURNING p.id INTO v_program_id;
+
+    IF v_program_id IS NULL THEN
+      RAISE EXCEPTION 'Program % not found', p_program_id;
+    END IF;
+
+    -- Re-ingest replaces extracted children
+    DELETE FROM public.eligibility_rules WHERE program_id = v_program_id;
+    DELETE FROM public.requirements WHERE program_id = v_program_id;
+    DELETE FROM public.deadlines WHERE program_id = v_program_id;
+  END IF;
+
+  INSERT INTO public.eligibility_rules (program_id, rule_type, operator, value, confidence, source_snippet)
+  SELECT v_program_id, r.rule_type, r.operator, COALESCE(r.value, '{}'::jsonb), r.confidence, r.source_snippet
+  FROM jsonb_to_recordset(COALESCE(p_rules, '[]'::jsonb))
+    AS r(rule_type text, operator text, value jsonb, confidence text, source_snippet text);
+
+  INSERT INTO public.requirements (program_id, type, description, mandatory)
+  SELECT v_program_id, r.type, r.description, r.mandatory
+  FROM jsonb_to_recordset(COALESCE(p_requirements, '[]'::jsonb))
+    AS r(type text, description text, mandatory boolean);
+
+  INSERT INTO public.deadlines (program_id, cycle, deadline_date, stage)
+  SELECT v_program_id, r.cycle, r.deadline_date, r.stage
+  FROM jsonb_to_recordset(COALESCE(p_deadlines, '[]'::jsonb))
+    AS r(cycle text, deadline_date date, stage text);
+
+  IF p_source IS NOT NULL THEN
+    INSERT INTO public.sources (program_id, url, agent_model, raw_summary, confidence_score)
+    SELECT v_program_id, r.url, r.agent_model, r.raw_summary, r.confidence_score
+    FROM jsonb_to_record(p_source)
+      AS r(url text, agent_model text, raw_summary text, confidence_score numeric);
+  END IF;
+
+  INSERT INTO public.agent_reviews (program_id, issue_type, note, severity)
+  SELECT v_program_id, r.issue_type, r.note, r.severity
+  FROM jsonb_to_recordset(COALESCE(p_reviews, '[]'::jsonb))
+    AS r(issue_type text, note text, severity text);
+
+  RETURN v_program_id;
+END;
+$$;
+
+COMMENT ON FUNCTION public.create_program_with_children IS 'Agent ingest: insert or replace a program and its rules, requirements, deadlines, source and reviews atomically';
+
+-- Only the agent (service role) may call this through PostgREST
+REVOKE EXECUTE ON FUNCTION public.create_program_with_children(jsonb, jsonb, jsonb, jsonb, jsonb, jsonb, uuid) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.create_program_with_children(jsonb, jsonb, jsonb, jsonb, jsonb, jsonb, uuid) TO service_role;
@@ -0,0 +1,8 @@
+-- Eligibility read path
+-- /check-eligibility filters active programs by level and embeds their rules.
+
+-- Covers WHERE status = 'active' AND level = <target degree>
+CREATE INDEX IF NOT EXISTS idx_programs_status_level ON public.programs(status, level);
+
+-- Rules are looked up per program for the embedded eligibility_rules list
+CREATE INDEX IF NOT EXISTS idx_eligibility_rules_program ON public.eligibility_rules(program_id);
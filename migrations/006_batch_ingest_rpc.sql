@@ -0,0 +1,41 @@
+-- Batch ingest write path
+-- Writes every program of a /batch-ingest call in one round trip.
+-- Each item is the argument set of create_program_with_children (migrations/004);
+-- items run in their own subtransaction so one bad program doesn't sink the batch.
+
+CREATE OR REPLACE FUNCTION public.create_programs_with_children(p_items jsonb)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_item jsonb;
+  v_program_id uuid;
+  v_results jsonb := '[]'::jsonb;
+BEGIN
+  FOR v_item IN SELECT value FROM jsonb_array_elements(COALESCE(p_items, '[]'::jsonb)) WITH ORDINALITY ORDER BY ordinality
+  LOOP
+    BEGIN
+      v_program_id := public.create_program_with_children(
+        v_item->'p_program',
+        COALESCE(v_item->'p_rules', '[]'::jsonb),
+        COALESCE(v_item->'p_requirements', '[]'::jsonb),
+        COALESCE(v_item->'p_deadlines', '[]'::jsonb),
+        NULLIF(v_item->'p_source', 'null'::jsonb),
+        COALESCE(v_item->'p_reviews', '[]'::jsonb),
+        NULL
+      );
+      v_results := v_results || jsonb_build_array(jsonb_build_object('program_id', v_program_id));
+    EXCEPTION WHEN OTHERS THEN
+      v_results := v_results || jsonb_build_array(jsonb_build_object('error', SQLERRM));
+    END;
+  END LOOP;
+
+  RETURN v_results;
+END;
+$$;
+
+COMMENT ON FUNCTION public.create_programs_with_children IS 'Agent batch ingest: create many programs with their children; returns one {program_id} or {error} per item, in order';
+
+-- Only the agent (service role) may call this through PostgREST
+REVOKE EXECUTE ON FUNCTION public.create_programs_with_children(jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.create_programs_with_children(jsonb) TO service_role;
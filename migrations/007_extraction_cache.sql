@@ -0,0 +1,16 @@
+-- Extraction cache
+-- Gemini extraction results keyed on a hash of (model, prompt version, page content),
+-- so re-ingesting an unchanged page skips the LLM call.
+
+CREATE TABLE IF NOT EXISTS public.extraction_cache (
+  key text PRIMARY KEY,
+  model text NOT NULL,
+  prompt_version text NOT NULL,
+  payload jsonb NOT NULL,
+  created_at timestamptz DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_extraction_cache_created ON public.extraction_cache(created_at);
+
+-- Agent-only table: RLS on with no policies, so only the service role can read or write it
+ALTER TABLE public.extraction_cache ENABLE ROW LEVEL SECURITY;
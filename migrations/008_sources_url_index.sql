@@ -0,0 +1,4 @@
+-- Batch ingest freshness check
+-- /batch-ingest looks up the newest source row per URL to skip recently ingested pages.
+
+CREATE INDEX IF NOT EXISTS idx_sources_url_created ON public.sources(url, created_at DESC);